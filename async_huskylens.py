@@ -0,0 +1,195 @@
+"""
+واجهة غير متزامنة (asyncio) للتحكم في HUSKYLENS
+Asyncio client for HUSKYLENS
+
+تستخدم نفس بناء الحزم وتحليل الإطارات الموجود في huskylens.py
+حتى لا تختلف النسختان المتزامنة وغير المتزامنة.
+"""
+
+import asyncio
+import struct
+from typing import List, Optional, Tuple
+
+from huskylens import (HuskyLens, HuskyLensError, HuskyLensObject, build_packet,
+                       decode_arrows, decode_blocks, pending_frame_count)
+
+try:
+    import serial_asyncio
+except ImportError:  # اختياري - مطلوب فقط للاتصال بمنفذ تسلسلي حقيقي
+    serial_asyncio = None
+
+class AsyncHuskyLens:
+    """كلاس التحكم غير المتزامن في HUSKYLENS"""
+    
+    def __init__(self, port: str = 'COM3', baudrate: int = 9600,
+                 timeout: float = 1.0, ready_timeout: float = 2.0):
+        """
+        إنشاء عميل غير متزامن لـ HUSKYLENS
+        
+        Args:
+            port: منفذ الاتصال التسلسلي (مثل COM3)
+            baudrate: سرعة الاتصال (افتراضي 9600)
+            timeout: أقصى مدة (بالثواني) لانتظار رد أي أمر
+            ready_timeout: أقصى مدة لانتظار جاهزية الجهاز عند الاتصال
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.ready_timeout = ready_timeout
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.current_algorithm = None  # آخر خوارزمية أكدها الجهاز
+        self.last_switch_duration = 0.0  # مدة آخر تغيير خوارزمية (ثوانٍ)
+        self._io_lock = asyncio.Lock()
+        self._stale_window = 0.0  # مهلة آخر أمر لم يكتمل رده (0 إذا لا توجد بقايا)
+    
+    @classmethod
+    def from_streams(cls, reader: asyncio.StreamReader, writer, **kwargs) -> 'AsyncHuskyLens':
+        """إنشاء عميل فوق ناقل جاهز (pty أو ناقل وهمي في الذاكرة للاختبار)"""
+        husky = cls(**kwargs)
+        husky.reader = reader
+        husky.writer = writer
+        return husky
+    
+    async def connect(self) -> bool:
+        """إنشاء اتصال مع HUSKYLENS وانتظار جاهزيته"""
+        try:
+            if self.reader is None:
+                if serial_asyncio is None:
+                    raise HuskyLensError("مكتبة pyserial-asyncio غير مثبتة")
+                self.reader, self.writer = await serial_asyncio.open_serial_connection(
+                    url=self.port, baudrate=self.baudrate)
+            # جهاز جديد أو أعيد تشغيله: لا نعرف خوارزميته الحالية
+            self.current_algorithm = None
+            
+            if not await self.wait_until_ready(self.ready_timeout):
+                raise HuskyLensError("لم يستجب الجهاز لأمر الجاهزية")
+            
+            print(f"✅ تم الاتصال بـ HUSKYLENS على {self.port}")
+            return True
+        except Exception as e:
+            print(f"❌ خطأ في الاتصال: {e}")
+            return False
+    
+    async def disconnect(self):
+        """قطع الاتصال مع HUSKYLENS"""
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+            self.reader = None
+            self.writer = None
+            print("🔌 تم قطع الاتصال مع HUSKYLENS")
+    
+    async def _send_command(self, command: int, data: bytes = b'',
+                            timeout: Optional[float] = None) -> bytes:
+        """إرسال أمر إلى HUSKYLENS وقراءة الرد كاملاً"""
+        if self.writer is None:
+            raise HuskyLensError("لا يوجد اتصال مع HUSKYLENS")
+        timeout = self.timeout if timeout is None else timeout
+        
+        async with self._io_lock:
+            if self._stale_window:
+                await self._discard_stale()
+            self.writer.write(build_packet(command, data))
+            await self.writer.drain()
+            # يبقى العلم مرفوعاً إذا لم يكتمل الرد (مهلة أو خطأ أو إلغاء من الخارج)
+            self._stale_window = timeout
+            try:
+                response = await asyncio.wait_for(self._read_response(), timeout)
+            except asyncio.TimeoutError:
+                raise HuskyLensError("انتهت مهلة انتظار الرد من HUSKYLENS")
+            self._stale_window = 0.0
+            return response
+    
+    async def _discard_stale(self):
+        """تجاهل بقايا رد أمر سابق لم يكتمل حتى لا تُقرأ كرد للأمر التالي"""
+        # الرد المتأخر قد يصل بعد المهلة: نستهلك كل ما يصل حتى يهدأ الخط لمدة مهلة ذلك الأمر
+        while True:
+            try:
+                data = await asyncio.wait_for(self.reader.read(4096), self._stale_window)
+            except asyncio.TimeoutError:
+                break
+            if not data:
+                break
+        self._stale_window = 0.0
+    
+    async def _read_response(self) -> bytes:
+        """قراءة إطار الرد الأول وكل إطارات الكائنات التي تليه"""
+        first = await self._read_frame()
+        response = bytearray(first)
+        for _ in range(pending_frame_count(first)):
+            response += await self._read_frame()
+        return bytes(response)
+    
+    async def _read_frame(self) -> bytes:
+        """قراءة إطار واحد كامل مع المزامنة على الترويسة"""
+        header = HuskyLens.FRAME_HEADER
+        try:
+            # readuntil يتجاوز أي بايتات عشوائية قبل الترويسة
+            await self.reader.readuntil(header)
+            length, command = await self.reader.readexactly(2)
+            payload = await self.reader.readexactly(length + 1)
+        except asyncio.IncompleteReadError:
+            raise HuskyLensError("انقطع الاتصال أثناء قراءة الرد")
+        return header + bytes((length, command)) + payload
+    
+    async def knock(self, timeout: float = 0.1) -> bool:
+        """إرسال أمر الطرق (knock) والتحقق من رد الجهاز بـ OK"""
+        try:
+            response = await self._send_command(HuskyLens.COMMAND_REQUEST_KNOCK, timeout=timeout)
+            return response[4] == HuskyLens.COMMAND_RETURN_OK
+        except HuskyLensError:
+            return False
+    
+    async def wait_until_ready(self, timeout: float = 2.0) -> bool:
+        """انتظار جاهزية الجهاز بتكرار أمر الطرق"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if await self.knock():
+                return True
+            if loop.time() >= deadline:
+                return False
+    
+    async def set_algorithm(self, algorithm: int, force: bool = False) -> bool:
+        """تغيير خوارزمية الكشف (يتجاوز الأمر إذا كانت مفعلة مسبقاً)"""
+        if algorithm == self.current_algorithm and not force:
+            return True
+        
+        try:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            response = await self._send_command(HuskyLens.COMMAND_ALGORITHM,
+                                                struct.pack('B', algorithm))
+            if response[4] != HuskyLens.COMMAND_RETURN_OK:
+                raise HuskyLensError("لم يؤكد الجهاز تغيير الخوارزمية")
+            
+            self.last_switch_duration = loop.time() - start
+            self.current_algorithm = algorithm
+            print(f"🔄 تم تغيير الوضع إلى: {HuskyLens.ALGORITHM_NAMES.get(algorithm, 'غير معروف')}")
+            return True
+        except Exception as e:
+            self.current_algorithm = None
+            print(f"❌ خطأ في تغيير الخوارزمية: {e}")
+            return False
+    
+    async def get_blocks(self) -> List[HuskyLensObject]:
+        """الحصول على الكائنات المكتشفة (مستطيلات)"""
+        try:
+            response = await self._send_command(HuskyLens.COMMAND_REQUEST_BLOCKS)
+            return decode_blocks(response)
+        except Exception as e:
+            print(f"❌ خطأ في قراءة الكائنات: {e}")
+            return []
+    
+    async def get_arrows(self) -> List[Tuple[int, int, int, int]]:
+        """الحصول على الأسهم (للخطوط والاتجاهات)"""
+        try:
+            response = await self._send_command(HuskyLens.COMMAND_REQUEST_ARROWS)
+            return decode_arrows(response)
+        except Exception as e:
+            print(f"❌ خطأ في قراءة الأسهم: {e}")
+            return []
@@ -0,0 +1,221 @@
+"""
+اختبارات أداء HUSKYLENS
+Benchmark suite for HUSKYLENS
+
+تقيس بناء الحزم، تحليل الكتل، تكلفة المتتبع، تحليل الألوان،
+وزمن الحلقة الكاملة من الكشف إلى الأمر للروبوت الذكي مع جهاز محاكى.
+النتائج تُحفظ بصيغة JSON لمقارنتها بين الإصدارات:
+
+    python benchmarks.py --output bench.json
+    python benchmarks.py --compare bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from huskylens import HuskyLens, HuskyLensObject, build_packet, decode_blocks, decode_detection_frame
+from simulator import HuskyLensSimulator, SimulatedScene, SimulatedTransport
+from utils import ColorAnalyzer, DominantColorEngine, HuskyLensUtils, ObjectTracker, OverlayRenderer
+
+OBJECT_COUNTS = (1, 10, 50, 100, 200)
+
+def measure(func: Callable[[], object], repeat: int = 5, number: int = 200) -> Dict[str, float]:
+    """قياس زمن دالة: أفضل ووسيط زمن الاستدعاء الواحد بالميكروثانية"""
+    func()  # إحماء
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    median = statistics.median(samples)
+    return {
+        "min_us": min(samples) * 1e6,
+        "median_us": median * 1e6,
+        "ops_per_s": 1.0 / median if median > 0 else float('inf'),
+    }
+
+def _simulated_response(count: int, seed: int = 0) -> bytes:
+    """رد طلب كتل جاهز من المحاكي بعدد كائنات محدد"""
+    simulator = HuskyLensSimulator(SimulatedScene(num_objects=count, seed=seed), seed=seed)
+    return simulator.handle(build_packet(HuskyLens.COMMAND_REQUEST_BLOCKS))
+
+def bench_protocol(scale: int) -> Dict[str, dict]:
+    """بناء الحزم وتحليل الكتل (إطارات/ثانية) لأعداد كائنات مختلفة"""
+    results = {
+        "build_packet": measure(lambda: build_packet(HuskyLens.COMMAND_REQUEST_BLOCKS),
+                                number=2000 * scale),
+        "build_packet_with_data": measure(lambda: build_packet(HuskyLens.COMMAND_ALGORITHM, b'\x01'),
+                                          number=2000 * scale),
+    }
+    for count in OBJECT_COUNTS:
+        response = _simulated_response(count)
+        results[f"decode_blocks[{count}]"] = measure(lambda: decode_blocks(response), number=50 * scale)
+        results[f"decode_detection_frame[{count}]"] = measure(
+            lambda: decode_detection_frame(response), number=50 * scale)
+    return results
+
+def bench_tracker(scale: int) -> Dict[str, dict]:
+    """تكلفة ObjectTracker.update مقابل عدد الكائنات"""
+    results = {}
+    for count in OBJECT_COUNTS:
+        for kalman in (False, True):
+            rng = np.random.default_rng(count)
+            positions = rng.uniform(0, 300, (count, 2))
+            tracker = ObjectTracker(kalman=kalman)
+            clock = [0.0]
+            
+            def step():
+                positions[:] += rng.normal(0, 2, positions.shape)
+                clock[0] += 1 / 30
+                boxes = np.hstack((positions, np.full((count, 2), 10))).astype(np.int64)
+                tracker.update(boxes, clock[0])
+            
+            name = f"tracker_update{'_kalman' if kalman else ''}[{count}]"
+            results[name] = measure(step, number=20 * scale)
+    return results
+
+def bench_color(scale: int) -> Dict[str, dict]:
+    """تكلفة تحليل لون منطقة واحدة وتصنيفه، ودفعة كاملة من الصناديق"""
+    image = np.random.default_rng(0).integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    analyzer = ColorAnalyzer()
+    results = {}
+    for size in (10, 40, 120):
+        def roi():
+            color = analyzer.get_dominant_color(image, 50, 50, size, size)
+            analyzer.classify_color(color)
+        results[f"color_roi[{size}x{size}]"] = measure(roi, number=200 * scale)
+    
+    rng = np.random.default_rng(1)
+    for count in (10, 50):
+        boxes = np.column_stack((rng.integers(0, 280, count), rng.integers(0, 200, count),
+                                 rng.integers(5, 40, count), rng.integers(5, 40, count)))
+        results[f"color_batch[{count}]"] = measure(
+            lambda: analyzer.classify_boxes(image, boxes), number=200 * scale)
+    
+    for method in DominantColorEngine.METHODS:
+        engine = DominantColorEngine(method=method, cache_size=0)
+        results[f"dominant_{method}[40x40]"] = measure(
+            lambda: engine.extract(image, 50, 50, 40, 40), number=50 * scale)
+    cached = DominantColorEngine()
+    results["dominant_cached[40x40]"] = measure(
+        lambda: cached.extract(image, 50, 50, 40, 40, track_id=1), number=200 * scale)
+    return results
+
+def bench_render(scale: int) -> Dict[str, dict]:
+    """رسم كتل مسماة: أدوات draw_* لكل كائن مقابل OverlayRenderer (للمقارنة فقط، ليس تحسيناً مزعوماً)"""
+    image = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    renderer = OverlayRenderer()
+    preview = OverlayRenderer(scale=0.5)
+    results = {}
+    for count in (10, 50):
+        scene = SimulatedScene(num_objects=count, frame_size=(600, 440), seed=count)
+        objects = [HuskyLensObject("block", cx - w // 2, cy - h // 2, w, h, obj_id)
+                   for cx, cy, w, h, obj_id in scene.blocks().tolist()]
+        
+        def per_object():
+            canvas = image.copy()
+            for obj in objects:
+                HuskyLensUtils.draw_detection_box(canvas, obj.x, obj.y, obj.width, obj.height, f"ID{obj.id}")
+                HuskyLensUtils.draw_center_point(canvas, obj.center_x, obj.center_y)
+        
+        results[f"draw_per_object[{count}]"] = measure(per_object, number=20 * scale)
+        results[f"overlay_render[{count}]"] = measure(
+            lambda: renderer.render(image, objects), number=20 * scale)
+        results[f"overlay_preview[{count}]"] = measure(
+            lambda: preview.render(image, objects), number=20 * scale)
+    return results
+
+def bench_end_to_end(scale: int) -> Dict[str, dict]:
+    """زمن الحلقة الكاملة: طلب الكشوفات ← اختيار الهدف ← حساب الاتجاه ← تنفيذ الحركة"""
+    from smart_robot import SmartRobot
+    
+    results = {}
+    for count in (1, 10, 100):
+        simulator = HuskyLensSimulator(SimulatedScene(num_objects=count, fps=1000, seed=count))
+        robot = SmartRobot(transport=SimulatedTransport(simulator))
+        with contextlib.redirect_stdout(io.StringIO()):
+            robot.start()
+            
+            def loop_once():
+                detections = robot.get_detections()
+                target = robot.find_best_target(detections)
+                if target is not None:
+                    robot.execute_movement(robot.calculate_motion_command(target))
+            
+            results[f"detection_to_command[{count}]"] = measure(loop_once, number=50 * scale)
+            robot.stop()
+    return results
+
+SUITES = {
+    "protocol": bench_protocol,
+    "tracker": bench_tracker,
+    "color": bench_color,
+    "render": bench_render,
+    "end_to_end": bench_end_to_end,
+}
+
+def run(suites: List[str], scale: int = 1) -> dict:
+    """تشغيل المجموعات المحددة وإرجاع النتائج مع معلومات البيئة"""
+    report = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": {},
+    }
+    for name in suites:
+        print(f"⏱️ تشغيل {name}...")
+        for key, value in SUITES[name](scale).items():
+            report["results"][f"{name}.{key}"] = value
+            print(f"  {key:<40} {value['median_us']:>12.2f} µs")
+    return report
+
+def compare(report: dict, baseline: dict, threshold: float = 0.2) -> List[str]:
+    """أسماء القياسات التي تباطأت أكثر من threshold مقارنة بخط الأساس"""
+    regressions = []
+    for name, value in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old and value["median_us"] > old["median_us"] * (1 + threshold):
+            regressions.append(f"{name}: {old['median_us']:.2f} → {value['median_us']:.2f} µs")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="اختبارات أداء HUSKYLENS")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES),
+                        help="مجموعة محددة (يمكن تكرارها، الافتراضي الكل)")
+    parser.add_argument("--scale", type=int, default=1, help="مضاعف عدد التكرارات")
+    parser.add_argument("--output", help="ملف JSON لحفظ النتائج")
+    parser.add_argument("--compare", help="ملف JSON سابق للمقارنة")
+    parser.add_argument("--threshold", type=float, default=0.2, help="نسبة التباطؤ المسموح بها")
+    args = parser.parse_args(argv)
+    
+    report = run(args.suite or list(SUITES), args.scale)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 تم حفظ النتائج في: {args.output}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print("❌ تراجع في الأداء:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("✅ لا يوجد تراجع في الأداء")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
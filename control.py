@@ -0,0 +1,117 @@
+"""
+التحكم التناسبي في حركة الروبوت
+Numeric motion commands and PID control
+
+يحول موقع الهدف وحجمه إلى أخطاء معيارية (في المدى -1..1) ثم إلى سرعات
+مستمرة عبر متحكمات PID بدلاً من مناطق الأثلاث ذات القرار الثنائي.
+"""
+
+import time
+from typing import NamedTuple, Optional
+
+class MotionCommand(NamedTuple):
+    """أمر حركة رقمي: سرعات معيارية في المدى -1..1"""
+    pan: float      # موجب = استدر يميناً
+    tilt: float     # موجب = وجه الكاميرا للأسفل
+    forward: float  # موجب = تقدم، سالب = تراجع
+    
+    def __str__(self) -> str:
+        return f"دوران={self.pan:+.2f}, إمالة={self.tilt:+.2f}, تقدم={self.forward:+.2f}"
+
+STOP = MotionCommand(0.0, 0.0, 0.0)
+
+class PIDController:
+    """متحكم PID بحدود للخرج وللتكامل (منع التشبع)"""
+    
+    def __init__(self, kp: float, ki: float = 0.0, kd: float = 0.0,
+                 output_limit: float = 1.0, integral_limit: float = 1.0, deadband: float = 0.0):
+        """
+        Args:
+            kp, ki, kd: معاملات التناسب والتكامل والتفاضل
+            output_limit: أقصى قيمة مطلقة للخرج
+            integral_limit: أقصى قيمة مطلقة لمجموع الخطأ المتكامل
+            deadband: خطأ أصغر من هذه القيمة يعامل كصفر لتجنب الاهتزاز حول المركز
+        """
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.output_limit = output_limit
+        self.integral_limit = integral_limit
+        self.deadband = deadband
+        self.reset()
+    
+    def reset(self):
+        """مسح الحالة (عند فقدان الهدف مثلاً)"""
+        self.integral = 0.0
+        self.previous_error: Optional[float] = None
+    
+    def update(self, error: float, dt: float) -> float:
+        """حساب الخرج لخطأ جديد بعد مرور dt ثانية"""
+        if abs(error) < self.deadband:
+            error = 0.0
+        
+        derivative = 0.0
+        if dt > 0:
+            self.integral += error * dt
+            self.integral = max(-self.integral_limit, min(self.integral_limit, self.integral))
+            if self.previous_error is not None:
+                derivative = (error - self.previous_error) / dt
+        self.previous_error = error
+        
+        output = self.kp * error + self.ki * self.integral + self.kd * derivative
+        return max(-self.output_limit, min(self.output_limit, output))
+
+class TrackingController:
+    """تحويل موقع الهدف وحجمه إلى MotionCommand عبر ثلاثة متحكمات PID"""
+    
+    def __init__(self, screen_width: int = 320, screen_height: int = 240,
+                 target_area: float = 4000.0,
+                 pan: Optional[PIDController] = None,
+                 tilt: Optional[PIDController] = None,
+                 forward: Optional[PIDController] = None):
+        """
+        Args:
+            screen_width, screen_height: أبعاد صورة HUSKYLENS
+            target_area: مساحة الهدف (بكسل²) عند المسافة المطلوبة
+            pan, tilt, forward: متحكمات مخصصة (وإلا تستخدم المعاملات الافتراضية)
+        """
+        self.half_width = screen_width / 2
+        self.half_height = screen_height / 2
+        self.target_area = target_area
+        self.pan = pan or PIDController(kp=0.8, ki=0.1, kd=0.05, deadband=0.05)
+        self.tilt = tilt or PIDController(kp=0.6, ki=0.05, kd=0.05, deadband=0.05)
+        self.forward = forward or PIDController(kp=1.0, ki=0.0, kd=0.1, deadband=0.1)
+        self._last_update: Optional[float] = None
+    
+    def errors(self, center_x: float, center_y: float, area: float) -> MotionCommand:
+        """الأخطاء المعيارية: بعد الهدف عن المركز وعن المسافة المطلوبة"""
+        pan_error = (center_x - self.half_width) / self.half_width
+        tilt_error = (center_y - self.half_height) / self.half_height
+        # الجذر التربيعي للمساحة يتناسب خطياً تقريباً مع المسافة
+        forward_error = 1.0 - (max(area, 0.0) / self.target_area) ** 0.5
+        return MotionCommand(
+            max(-1.0, min(1.0, pan_error)),
+            max(-1.0, min(1.0, tilt_error)),
+            max(-1.0, min(1.0, forward_error)),
+        )
+    
+    def update(self, center_x: float, center_y: float, area: float,
+               timestamp: Optional[float] = None) -> MotionCommand:
+        """أمر الحركة للقياس الحالي"""
+        now = time.monotonic() if timestamp is None else timestamp
+        dt = 0.0 if self._last_update is None else now - self._last_update
+        self._last_update = now
+        
+        pan_error, tilt_error, forward_error = self.errors(center_x, center_y, area)
+        return MotionCommand(
+            self.pan.update(pan_error, dt),
+            self.tilt.update(tilt_error, dt),
+            self.forward.update(forward_error, dt),
+        )
+    
+    def reset(self):
+        """مسح حالة جميع المتحكمات"""
+        self.pan.reset()
+        self.tilt.reset()
+        self.forward.reset()
+        self._last_update = None
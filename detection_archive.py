@@ -0,0 +1,252 @@
+"""
+أرشيف عمودي للكشوفات يُفتح عبر np.memmap
+Memory-mapped columnar archive for detection history
+
+كل عمود (الوقت، الجهاز، الخوارزمية، المعرف، x، y، العرض، الارتفاع) ملف ثنائي
+ثابت العرض، فيمكن فتح أسابيع من البيانات دون نسخها إلى الذاكرة وتشغيل
+الاستعلامات على ملايين الصفوف دون إنشاء كائنات Python.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+# أعمدة الأرشيف وأنواعها (x و y للزاوية العلوية اليسرى كما في HuskyLensObject)
+COLUMNS = {
+    "timestamp": np.dtype('<f8'),
+    "device": np.dtype('<u2'),
+    "algorithm": np.dtype('u1'),
+    "id": np.dtype('<u2'),
+    "x": np.dtype('<i2'),
+    "y": np.dtype('<i2'),
+    "width": np.dtype('<u2'),
+    "height": np.dtype('<u2'),
+}
+
+_META_FILE = "meta.json"
+
+def _load_devices(directory: str) -> list:
+    """قراءة جدول أسماء الأجهزة من ملف البيانات الوصفية"""
+    try:
+        with open(os.path.join(directory, _META_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f).get("devices", [])
+    except FileNotFoundError:
+        return []
+
+def _column_rows(directory: str) -> int:
+    """عدد الصفوف الكاملة المشترك بين كل الأعمدة"""
+    sizes = []
+    for name, dtype in COLUMNS.items():
+        path = os.path.join(directory, f"{name}.bin")
+        sizes.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+    # أقل طول بين الأعمدة يحمي من صف ناقص بعد توقف مفاجئ
+    return min(sizes)
+
+class DetectionArchiveWriter:
+    """كاتب الأرشيف العمودي: يجمع الصفوف في الذاكرة ويضيفها لملفات الأعمدة"""
+    
+    def __init__(self, directory: str, batch_rows: int = 65536):
+        """
+        Args:
+            directory: مجلد الأرشيف (يُنشأ إذا لم يكن موجوداً)
+            batch_rows: عدد الصفوف المجمعة قبل الكتابة على القرص
+        """
+        self.directory = directory
+        self.batch_rows = batch_rows
+        os.makedirs(directory, exist_ok=True)
+        
+        self.devices = _load_devices(directory)
+        self._device_codes = {name: code for code, name in enumerate(self.devices)}
+        self._chunks: Dict[str, list] = {name: [] for name in COLUMNS}
+        self._pending = 0
+        self._truncate_columns()
+    
+    def _truncate_columns(self):
+        """قص كل الأعمدة إلى عدد الصفوف المشترك قبل الإضافة"""
+        # بعد كتابة ناقصة (توقف أثناء flush) تختلف أطوال الأعمدة؛ الإضافة فوقها تزيح الصفوف عن بعضها
+        rows = _column_rows(self.directory)
+        for name, dtype in COLUMNS.items():
+            path = os.path.join(self.directory, f"{name}.bin")
+            if os.path.exists(path) and os.path.getsize(path) != rows * dtype.itemsize:
+                os.truncate(path, rows * dtype.itemsize)
+    
+    def __enter__(self) -> 'DetectionArchiveWriter':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _device_code(self, device: str) -> int:
+        """رمز رقمي ثابت لاسم الجهاز"""
+        code = self._device_codes.get(device)
+        if code is None:
+            code = len(self.devices)
+            self.devices.append(device)
+            self._device_codes[device] = code
+            self._save_meta()
+        return code
+    
+    def _save_meta(self):
+        """حفظ جدول الأجهزة وتعريف الأعمدة"""
+        meta = {"devices": self.devices,
+                "columns": {name: dtype.str for name, dtype in COLUMNS.items()}}
+        with open(os.path.join(self.directory, _META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+    
+    def append(self, timestamp: float, objects, device: str = "default", algorithm: int = 0):
+        """
+        إضافة كائنات إطار واحد
+        
+        Args:
+            timestamp: وقت الإطار
+            objects: DetectionFrame أو قائمة HuskyLensObject
+            device: اسم الجهاز (مثل المنفذ)
+            algorithm: الخوارزمية النشطة وقت الإطار
+        """
+        if hasattr(objects, 'boxes'):
+            boxes, ids = objects.boxes, objects.ids
+        else:
+            boxes = np.array([(obj.x, obj.y, obj.width, obj.height) for obj in objects],
+                             dtype=np.int64).reshape(-1, 4)
+            ids = np.array([obj.id for obj in objects], dtype=np.int64)
+        self.append_columns(np.full(len(ids), timestamp), np.full(len(ids), self._device_code(device)),
+                            np.full(len(ids), algorithm), ids, boxes)
+    
+    def append_columns(self, timestamps: np.ndarray, devices: np.ndarray, algorithms: np.ndarray,
+                       ids: np.ndarray, boxes: np.ndarray):
+        """إضافة صفوف جاهزة كمصفوفات (boxes بشكل (N, 4) = x, y, w, h)"""
+        count = len(ids)
+        if not count:
+            return
+        boxes = np.asarray(boxes).reshape(-1, 4)
+        values = {"timestamp": timestamps, "device": devices, "algorithm": algorithms, "id": ids,
+                  "x": boxes[:, 0], "y": boxes[:, 1], "width": boxes[:, 2], "height": boxes[:, 3]}
+        for name, dtype in COLUMNS.items():
+            self._chunks[name].append(np.asarray(values[name]).astype(dtype, copy=False))
+        self._pending += count
+        if self._pending >= self.batch_rows:
+            self.flush()
+    
+    def import_log(self, records: Iterable[dict], device: str = "default"):
+        """استيراد سجلات DetectionLogReader (حقل objects لكل سجل)"""
+        for record in records:
+            objects = record.get("objects", [])
+            if not objects:
+                continue
+            boxes = np.array([(o["x"], o["y"], o["width"], o["height"]) for o in objects])
+            ids = np.array([o.get("id", 0) for o in objects])
+            count = len(ids)
+            code = self._device_code(record.get("device", device))
+            self.append_columns(np.full(count, record.get("timestamp", 0.0)), np.full(count, code),
+                                np.full(count, record.get("algorithm", 0)), ids, boxes)
+    
+    def flush(self):
+        """إضافة الصفوف المجمعة إلى ملفات الأعمدة"""
+        if not self._pending:
+            return
+        if not os.path.exists(os.path.join(self.directory, _META_FILE)):
+            self._save_meta()
+        for name, chunks in self._chunks.items():
+            with open(os.path.join(self.directory, f"{name}.bin"), 'ab') as f:
+                np.concatenate(chunks).tofile(f)
+            chunks.clear()
+        self._pending = 0
+    
+    def close(self):
+        """كتابة ما تبقى"""
+        self.flush()
+
+class DetectionArchive:
+    """قراءة الأرشيف عبر np.memmap مع استعلامات متجهة"""
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.devices = _load_devices(directory)
+        
+        self.rows = _column_rows(directory)
+        
+        self.columns: Dict[str, np.ndarray] = {}
+        for name, dtype in COLUMNS.items():
+            if self.rows:
+                self.columns[name] = np.memmap(os.path.join(directory, f"{name}.bin"),
+                                               dtype=dtype, mode='r', shape=(self.rows,))
+            else:
+                self.columns[name] = np.zeros(0, dtype=dtype)
+    
+    def __len__(self) -> int:
+        return self.rows
+    
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+    
+    def time_slice(self, start: Optional[float] = None, end: Optional[float] = None) -> slice:
+        """نطاق الصفوف بين وقتين بالبحث الثنائي (الصفوف مضافة بترتيب زمني)"""
+        timestamps = self.columns["timestamp"]
+        first = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        last = self.rows if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        return slice(first, last)
+    
+    def time_range(self, start: Optional[float] = None,
+                   end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """كل الأعمدة بين وقتين كعروض على الملفات دون نسخ"""
+        rows = self.time_slice(start, end)
+        return {name: column[rows] for name, column in self.columns.items()}
+    
+    def _mask(self, rows: slice, obj_id: Optional[int], device: Optional[str]) -> Optional[np.ndarray]:
+        """قناع الصفوف حسب المعرف و/أو الجهاز (None = كل الصفوف)"""
+        mask = None
+        if obj_id is not None:
+            mask = self.columns["id"][rows] == obj_id
+        if device is not None:
+            if device not in self.devices:
+                return np.zeros(rows.stop - rows.start, dtype=bool)
+            device_mask = self.columns["device"][rows] == self.devices.index(device)
+            mask = device_mask if mask is None else mask & device_mask
+        return mask
+    
+    def trajectory(self, obj_id: int, device: Optional[str] = None, start: Optional[float] = None,
+                   end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        مسار كائن واحد
+        
+        Returns:
+            (الأوقات (N,)، المراكز (N, 2))
+        """
+        rows = self.time_slice(start, end)
+        mask = self._mask(rows, obj_id, device)
+        columns = {name: self.columns[name][rows][mask]
+                   for name in ("timestamp", "x", "y", "width", "height")}
+        centers = np.stack((columns["x"].astype(np.int32) + columns["width"] // 2,
+                            columns["y"].astype(np.int32) + columns["height"] // 2), axis=1)
+        return columns["timestamp"], centers
+    
+    def heatmap(self, bins: Tuple[int, int] = (32, 24), frame_size: Tuple[int, int] = (320, 240),
+                obj_id: Optional[int] = None, device: Optional[str] = None,
+                start: Optional[float] = None, end: Optional[float] = None,
+                chunk_rows: int = 1 << 20) -> np.ndarray:
+        """
+        خريطة حرارية لمراكز الكائنات، تُحسب على أجزاء لتحديد استهلاك الذاكرة
+        
+        Returns:
+            مصفوفة (bins_y, bins_x) من عدد الكشوفات في كل خلية
+        """
+        bins_x, bins_y = bins
+        width, height = frame_size
+        result = np.zeros((bins_y, bins_x), dtype=np.int64)
+        rows = self.time_slice(start, end)
+        
+        for first in range(rows.start, rows.stop, chunk_rows):
+            chunk = slice(first, min(first + chunk_rows, rows.stop))
+            center_x = self.columns["x"][chunk].astype(np.int32) + self.columns["width"][chunk] // 2
+            center_y = self.columns["y"][chunk].astype(np.int32) + self.columns["height"][chunk] // 2
+            mask = self._mask(chunk, obj_id, device)
+            if mask is not None:
+                center_x, center_y = center_x[mask], center_y[mask]
+            
+            cell_x = np.clip(center_x * bins_x // width, 0, bins_x - 1)
+            cell_y = np.clip(center_y * bins_y // height, 0, bins_y - 1)
+            result += np.bincount(cell_y * bins_x + cell_x,
+                                  minlength=bins_x * bins_y).reshape(bins_y, bins_x)
+        return result
@@ -0,0 +1,214 @@
+"""
+سجل كشوفات متدفق للإضافة فقط
+Streaming, append-only detection log
+
+كل سجل سطر JSON مستقل (NDJSON) يُكتب على دفعات، مع تدوير الملفات
+حسب الحجم أو الوقت وملف فهرس جانبي للبحث السريع حسب الطابع الزمني.
+على عكس HuskyLensUtils.save_detection_log لا يُحفظ السجل كاملاً في الذاكرة،
+وعند انقطاع التشغيل لا يضيع إلا آخر دفعة لم تُكتب.
+"""
+
+import bisect
+import glob
+import json
+import os
+import struct
+import time
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+# مدخل الفهرس: الطابع الزمني (float64) وموضع السجل في الملف (uint64)
+_INDEX_ENTRY = struct.Struct('<dQ')
+
+class DetectionLogWriter:
+    """كاتب سجل كشوفات متدفق مع كتابة على دفعات وتدوير للملفات"""
+    
+    def __init__(self, directory: str = ".", prefix: str = "huskylens_log",
+                 max_bytes: int = 64 * 1024 * 1024, max_seconds: float = 3600.0,
+                 batch_size: int = 100, flush_interval: float = 1.0,
+                 index_interval: float = 1.0):
+        """
+        Args:
+            directory: مجلد ملفات السجل
+            prefix: بادئة أسماء الملفات
+            max_bytes: حجم الملف الأقصى قبل التدوير
+            max_seconds: عمر الملف الأقصى قبل التدوير
+            batch_size: عدد السجلات المجمعة قبل الكتابة على القرص
+            flush_interval: أقصى مدة (ثوانٍ) يبقى فيها سجل في الذاكرة
+            index_interval: الفاصل الزمني بين مدخلات ملف الفهرس
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.index_interval = index_interval
+        
+        os.makedirs(directory, exist_ok=True)
+        self.path: Optional[str] = None
+        self._file = None
+        self._index = None
+        self._lines: List[bytes] = []
+        self._index_entries: List[bytes] = []
+        self._file_size = 0
+        self._buffered_size = 0
+        self._opened_at = 0.0
+        self._last_flush = time.monotonic()
+        self._last_indexed = float('-inf')
+        self._last_timestamp = float('-inf')
+    
+    def __enter__(self) -> 'DetectionLogWriter':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _open_new_file(self):
+        """فتح ملف سجل جديد مع ملف الفهرس الخاص به"""
+        self._close_files()
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.path = os.path.join(self.directory, f"{self.prefix}_{stamp}.ndjson")
+        self._file = open(self.path, 'ab')
+        self._index = open(self.path + ".idx", 'ab')
+        self._file_size = self._file.tell()
+        self._opened_at = time.monotonic()
+        self._last_indexed = float('-inf')
+        self._last_timestamp = float('-inf')
+    
+    def write(self, record: dict):
+        """إضافة سجل (يُضاف الطابع الزمني time.time() إذا لم يكن موجوداً)"""
+        if 'timestamp' not in record:
+            record = dict(record, timestamp=time.time())
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+        
+        if (self._file is None or self._file_size + self._buffered_size + len(line) > self.max_bytes
+                or time.monotonic() - self._opened_at > self.max_seconds):
+            self.flush()
+            self._open_new_file()
+        
+        timestamp = record['timestamp']
+        # رجوع الساعة يُفهرس دائماً حتى يكتشفه القارئ
+        if (timestamp - self._last_indexed >= self.index_interval
+                or timestamp < self._last_timestamp):
+            self._index_entries.append(
+                _INDEX_ENTRY.pack(timestamp, self._file_size + self._buffered_size))
+            self._last_indexed = timestamp
+        self._last_timestamp = timestamp
+        
+        self._lines.append(line)
+        self._buffered_size += len(line)
+        if (len(self._lines) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+    
+    def log_detections(self, objects, **fields):
+        """تسجيل كائنات إطار واحد (قائمة HuskyLensObject أو DetectionFrame) مع حقول إضافية"""
+        fields['objects'] = [{"id": obj.id, "x": obj.x, "y": obj.y,
+                              "width": obj.width, "height": obj.height} for obj in objects]
+        self.write(fields)
+    
+    def flush(self):
+        """كتابة الدفعة الحالية على القرص"""
+        self._last_flush = time.monotonic()
+        if not self._lines:
+            return
+        self._file.write(b''.join(self._lines))
+        self._file.flush()
+        if self._index_entries:
+            self._index.write(b''.join(self._index_entries))
+            self._index.flush()
+        self._file_size += self._buffered_size
+        self._lines = []
+        self._index_entries = []
+        self._buffered_size = 0
+    
+    def _close_files(self):
+        """إغلاق الملف الحالي وملف فهرسه"""
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = None
+            self._index = None
+    
+    def close(self):
+        """كتابة ما تبقى وإغلاق الملفات"""
+        self.flush()
+        self._close_files()
+
+class DetectionLogReader:
+    """قارئ كسول لسجلات DetectionLogWriter عبر كل الملفات المدورة"""
+    
+    def __init__(self, directory: str = ".", prefix: str = "huskylens_log"):
+        self.directory = directory
+        self.prefix = prefix
+    
+    def files(self) -> List[str]:
+        """ملفات السجل مرتبة زمنياً (الاسم يحتوي وقت الإنشاء)"""
+        return sorted(glob.glob(os.path.join(self.directory, f"{self.prefix}_*.ndjson")))
+    
+    @staticmethod
+    def _load_index(path: str) -> Tuple[List[float], List[int]]:
+        """قراءة الفهرس الجانبي: (الطوابع الزمنية، المواضع)"""
+        try:
+            with open(path + ".idx", 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return [], []
+        # تجاهل أي مدخل ناقص في النهاية (توقف مفاجئ)
+        usable = len(data) - len(data) % _INDEX_ENTRY.size
+        entries = list(_INDEX_ENTRY.iter_unpack(data[:usable]))
+        return [entry[0] for entry in entries], [entry[1] for entry in entries]
+    
+    @staticmethod
+    def _iter_file(path: str, offset: int = 0) -> Iterator[dict]:
+        """قراءة سجلات ملف واحد سطراً بسطر بدءاً من موضع معين"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # سطر أخير ناقص بعد توقف مفاجئ
+                    continue
+    
+    def __iter__(self) -> Iterator[dict]:
+        for path in self.files():
+            yield from self._iter_file(path)
+    
+    def iter_range(self, start: Optional[float] = None,
+                   end: Optional[float] = None) -> Iterator[dict]:
+        """
+        السجلات بين طابعين زمنيين (time.time) مع القفز مباشرة إلى البداية عبر الفهرس
+        
+        القفز والتوقف المبكر يفترضان أن الطوابع الزمنية تتزايد. الكاتب يفهرس كل رجوع
+        للساعة (ضبط ساعة النظام مثلاً)، فإذا ظهر في الفهرس تُقرأ كل الملفات وتُصفى السجلات.
+        """
+        files = self.files()
+        if not files:
+            return
+        indexes = [self._load_index(path) for path in files]
+        all_times = [timestamp for times, _ in indexes for timestamp in times]
+        ordered = all(a <= b for a, b in zip(all_times, all_times[1:]))
+        
+        first = 0
+        offset = 0
+        if start is not None and ordered:
+            # آخر ملف يبدأ قبل (أو عند) لحظة البداية
+            for i, (times, _) in enumerate(indexes):
+                if times and times[0] <= start:
+                    first = i
+            times, offsets = indexes[first]
+            position = bisect.bisect_right(times, start) - 1
+            offset = offsets[position] if position >= 0 else 0
+        
+        for i in range(first, len(files)):
+            for record in self._iter_file(files[i], offset if i == first else 0):
+                timestamp = record.get('timestamp', 0.0)
+                if start is not None and timestamp < start:
+                    continue
+                if end is not None and timestamp > end:
+                    if ordered:
+                        return
+                    continue
+                yield record
@@ -10,10 +10,14 @@ HUSKYLENS Controller Library
 - كشف الخطوط والعلامات
 """
 
-import serial
 import time
 import struct
-from typing import List, Tuple, Optional
+import threading
+import numpy as np
+from typing import Iterator, List, NamedTuple, Tuple, Optional
+
+from metrics import METRICS
+from transport import SerialTransport, Transport
 
 class HuskyLensError(Exception):
     """استثناء خاص بـ HUSKYLENS"""
@@ -21,6 +25,8 @@ class HuskyLensError(Exception):
 
 class HuskyLensObject:
     """كلاس لتمثيل كائن تم اكتشافه"""
+    __slots__ = ('type', 'x', 'y', 'width', 'height', 'id')
+    
     def __init__(self, obj_type: str, x: int, y: int, width: int, height: int, id: int = 0):
         self.type = obj_type
         self.x = x
@@ -28,12 +34,289 @@ class HuskyLensObject:
         self.width = width
         self.height = height
         self.id = id
-        self.center_x = x + width // 2
-        self.center_y = y + height // 2
+    
+    @property
+    def center_x(self) -> int:
+        return self.x + self.width // 2
+    
+    @property
+    def center_y(self) -> int:
+        return self.y + self.height // 2
 
     def __str__(self):
         return f"Object({self.type}, ID:{self.id}, Center:({self.center_x},{self.center_y}), Size:{self.width}x{self.height})"
 
+# تخطيط الكائن كما يصل على السلك: المركز، الحجم، المعرف (قيم 16 بت little-endian)
+BLOCK_DTYPE = np.dtype([('center_x', '<u2'), ('center_y', '<u2'),
+                        ('width', '<u2'), ('height', '<u2'), ('id', '<u2')])
+
+class DetectionFrame:
+    """كل كائنات الإطار في مصفوفة NumPy واحدة مع عمليات متجهة وعرض كسول لكل كائن"""
+    __slots__ = ('data', 'timestamp', 'sequence')
+    
+    def __init__(self, data: Optional[np.ndarray] = None, timestamp: float = 0.0, sequence: int = 0):
+        self.data = data if data is not None else np.zeros(0, dtype=BLOCK_DTYPE)
+        self.timestamp = timestamp
+        self.sequence = sequence
+    
+    def __len__(self) -> int:
+        return len(self.data)
+    
+    def __bool__(self) -> bool:
+        return len(self.data) > 0
+    
+    def __getitem__(self, index: int) -> HuskyLensObject:
+        """إنشاء HuskyLensObject عند الطلب فقط"""
+        center_x, center_y, width, height, obj_id = self.data[index].tolist()
+        return HuskyLensObject("block", center_x - width // 2, center_y - height // 2,
+                               width, height, obj_id)
+    
+    def __iter__(self) -> Iterator[HuskyLensObject]:
+        for index in range(len(self.data)):
+            yield self[index]
+    
+    @property
+    def ids(self) -> np.ndarray:
+        """معرفات الكائنات (N,)"""
+        return self.data['id']
+    
+    @property
+    def centers(self) -> np.ndarray:
+        """مراكز الكائنات (N, 2)"""
+        return np.stack((self.data['center_x'], self.data['center_y']), axis=1).astype(np.int32)
+    
+    @property
+    def areas(self) -> np.ndarray:
+        """مساحات الكائنات (N,)"""
+        return self.data['width'].astype(np.int32) * self.data['height']
+    
+    @property
+    def boxes(self) -> np.ndarray:
+        """المستطيلات بصيغة (x, y, w, h) من الزاوية العلوية اليسرى (N, 4)"""
+        width = self.data['width'].astype(np.int32)
+        height = self.data['height'].astype(np.int32)
+        return np.stack((self.data['center_x'] - width // 2, self.data['center_y'] - height // 2,
+                         width, height), axis=1)
+    
+    def to_objects(self) -> List[HuskyLensObject]:
+        """تحويل الإطار إلى قائمة HuskyLensObject"""
+        return list(self)
+
+class StreamFrame(NamedTuple):
+    """إطار كشف منشور من خيط القراءة الخلفي"""
+    sequence: int
+    timestamp: float
+    blocks: DetectionFrame
+    arrows: List[Tuple[int, int, int, int]]
+
+class LatestFrameBuffer:
+    """مخزن مزدوج لأحدث إطار: الكاتب يملأ الخانة الاحتياطية ثم يبدل المؤشر"""
+    
+    def __init__(self):
+        self._slots: List[Optional[StreamFrame]] = [None, None]
+        self._index = 0
+    
+    def publish(self, frame: StreamFrame):
+        """نشر إطار جديد (يُستدعى من خيط الكاتب فقط)"""
+        back = self._index ^ 1
+        self._slots[back] = frame
+        # تبديل المؤشر عملية ذرية، فلا يرى القارئ إطاراً نصف مكتوب
+        self._index = back
+    
+    def latest(self) -> Optional[StreamFrame]:
+        """قراءة أحدث إطار منشور دون أي قفل"""
+        return self._slots[self._index]
+
+class CommandBatch:
+    """
+    تجميع عدة أوامر في رحلة تسلسلية واحدة
+    
+    مثال:
+        algorithm_ok, blocks, arrows = (husky.batch()
+                                        .set_algorithm(HuskyLens.OBJECT_TRACKING)
+                                        .request_blocks()
+                                        .request_arrows()
+                                        .execute())
+    """
+    
+    def __init__(self, husky: 'HuskyLens'):
+        self.husky = husky
+        self._entries = []  # (الأمر أو None إذا لا حاجة لإرساله، البيانات، دالة فك الترميز)
+        # الخوارزمية التي سيكون عليها الجهاز عند هذه النقطة من الدفعة (وليس عند بنائها)
+        self._algorithm = husky.current_algorithm
+    
+    def _add(self, command: Optional[int], data: bytes, decoder) -> 'CommandBatch':
+        """إضافة أمر مع دالة فك ترميز رده"""
+        self._entries.append((command, data, decoder))
+        return self
+    
+    def set_algorithm(self, algorithm: int) -> 'CommandBatch':
+        """تغيير الخوارزمية (النتيجة True عند استلام OK)"""
+        if algorithm == self._algorithm:
+            # ستكون مفعلة عند هذه النقطة: لا نرسل شيئاً، والنتيجة تتبع ما أكده الجهاز قبلها
+            return self._add(None, b'', lambda response: self.husky.current_algorithm == algorithm)
+        self._algorithm = algorithm
+        
+        def decode(response: bytes) -> bool:
+            if response[4] != HuskyLens.COMMAND_RETURN_OK:
+                self.husky.current_algorithm = None
+                return False
+            self.husky.current_algorithm = algorithm
+            return True
+        return self._add(HuskyLens.COMMAND_ALGORITHM, struct.pack('B', algorithm), decode)
+    
+    def request_blocks(self) -> 'CommandBatch':
+        """طلب الكائنات (النتيجة قائمة HuskyLensObject)"""
+        return self._add(HuskyLens.COMMAND_REQUEST_BLOCKS, b'', decode_blocks)
+    
+    def request_arrows(self) -> 'CommandBatch':
+        """طلب الأسهم (النتيجة قائمة من (x_tail, y_tail, x_head, y_head))"""
+        return self._add(HuskyLens.COMMAND_REQUEST_ARROWS, b'', decode_arrows)
+    
+    def request_info(self) -> 'CommandBatch':
+        """طلب إطار المعلومات (النتيجة (عدد الكائنات، عدد المعرفات المتعلمة، رقم الإطار))"""
+        return self._add(HuskyLens.COMMAND_REQUEST, b'', decode_info)
+    
+    def learn(self, object_id: int) -> 'CommandBatch':
+        """تعلم الكائن المعروض حالياً بالمعرف المحدد في الخوارزمية الحالية (النتيجة True عند OK)"""
+        return self._add(HuskyLens.COMMAND_REQUEST_LEARN, struct.pack('<H', object_id), _is_ok)
+    
+    def forget(self) -> 'CommandBatch':
+        """نسيان كل المعرفات المتعلمة في الخوارزمية الحالية (النتيجة True عند OK)"""
+        return self._add(HuskyLens.COMMAND_REQUEST_FORGET, b'', _is_ok)
+    
+    def set_custom_name(self, object_id: int, name: str) -> 'CommandBatch':
+        """تسمية معرف متعلم في الخوارزمية الحالية (النتيجة True عند OK)"""
+        return self._add(HuskyLens.COMMAND_REQUEST_CUSTOMNAMES, encode_custom_name(object_id, name), _is_ok)
+    
+    def execute(self) -> list:
+        """إرسال كل الأوامر متتالية وإرجاع نتائجها بنفس ترتيب الإضافة"""
+        entries, self._entries = self._entries, []
+        commands = [(command, data) for command, data, _ in entries if command is not None]
+        try:
+            responses = iter(self.husky._send_commands(commands) if commands else [])
+            return [decode(next(responses) if command is not None else None)
+                    for command, _, decode in entries]
+        finally:
+            # الدفعة قابلة لإعادة الاستخدام: نبدأ من الحالة المؤكدة بعد التنفيذ
+            self._algorithm = self.husky.current_algorithm
+
+# هياكل مترجمة مسبقاً لتحليل الإطارات دون إنشاء شرائح جديدة
+_FRAME_PREFIX = struct.Struct('<3sBB')   # الترويسة، الطول، الأمر
+_OBJECT_FIELDS = struct.Struct('<5H')    # خمس قيم 16 بت لكل كائن أو سهم
+
+def build_packet(command: int, data: bytes = b'') -> bytes:
+    """بناء حزمة أمر كاملة مع المجموع الاختباري"""
+    packet = HuskyLens.FRAME_HEADER + struct.pack('BB', len(data), command) + data
+    return packet + struct.pack('B', sum(packet) & 0xFF)
+
+def iter_frames(data: bytes) -> Iterator[Tuple[int, memoryview]]:
+    """المرور على الإطارات السليمة في الرد وإرجاع (الأمر، البيانات) دون نسخ"""
+    view = memoryview(data)
+    header = HuskyLens.FRAME_HEADER
+    end = len(view)
+    offset = 0
+    while offset + _FRAME_PREFIX.size < end:
+        prefix, length, command = _FRAME_PREFIX.unpack_from(view, offset)
+        if prefix != header:
+            # إعادة المزامنة على الترويسة التالية
+            offset = data.find(header, offset + 1)
+            if offset < 0:
+                return
+            continue
+        
+        payload_start = offset + _FRAME_PREFIX.size
+        checksum_index = payload_start + length
+        if checksum_index >= end:
+            return
+        
+        if sum(view[offset:checksum_index]) & 0xFF != view[checksum_index]:
+            # إطار تالف: تجاوز الترويسة والبحث عن الإطار التالي
+            METRICS.increment("husky.checksum_errors")
+            offset = data.find(header, offset + 1)
+            if offset < 0:
+                return
+            continue
+        
+        yield command, view[payload_start:checksum_index]
+        offset = checksum_index + 1
+
+def _is_ok(response: bytes) -> bool:
+    """هل الرد إطار OK"""
+    return response[4] == HuskyLens.COMMAND_RETURN_OK
+
+def encode_custom_name(object_id: int, name: str) -> bytes:
+    """بيانات أمر الاسم المخصص: المعرف، طول الاسم مع الصفر الختامي، الاسم، 0"""
+    encoded = name.encode('utf-8')
+    if len(encoded) > HuskyLens.MAX_NAME_LENGTH:
+        raise ValueError(f"الاسم أطول من {HuskyLens.MAX_NAME_LENGTH} بايت: {name}")
+    return bytes((object_id, len(encoded) + 1)) + encoded + b'\x00'
+
+def decode_info(data: bytes) -> Tuple[int, int, int]:
+    """قيم إطار المعلومات: (عدد الكائنات، عدد المعرفات المتعلمة، رقم الإطار)"""
+    for command, payload in iter_frames(data):
+        if command == HuskyLens.COMMAND_RETURN_INFO and len(payload) >= 6:
+            return struct.unpack_from('<3H', payload)
+    return (0, 0, 0)
+
+def pending_frame_count(frame: bytes) -> int:
+    """عدد إطارات الكائنات التي تلي هذا الإطار (يحددها إطار المعلومات فقط)"""
+    if frame[4] != HuskyLens.COMMAND_RETURN_INFO or frame[3] < 2:
+        return 0
+    # لا نثق بالعدد قبل التحقق من المجموع: عدد تالف يجعلنا ننتظر إطارات لن تصل
+    if sum(frame[:-1]) & 0xFF != frame[-1]:
+        METRICS.increment("husky.checksum_errors")
+        raise HuskyLensError("مجموع اختباري خاطئ في إطار المعلومات")
+    return frame[5] | (frame[6] << 8)
+
+@METRICS.timed("husky.parse_blocks")
+def decode_blocks(data: bytes) -> List[HuskyLensObject]:
+    """فك ترميز إطارات الكائنات (مستطيلات) من الرد"""
+    objects = []
+    for command, payload in iter_frames(data):
+        if command != HuskyLens.COMMAND_RETURN_BLOCK or len(payload) < _OBJECT_FIELDS.size:
+            continue
+        # إحداثيات البروتوكول تمثل المركز، نحولها إلى الزاوية العلوية اليسرى
+        center_x, center_y, width, height, obj_id = _OBJECT_FIELDS.unpack_from(payload)
+        objects.append(HuskyLensObject("block", center_x - width // 2, center_y - height // 2,
+                                       width, height, obj_id))
+    return objects
+
+# كل إطار كائن = 5 بايتات بادئة + 10 بايتات بيانات + بايت المجموع
+_OBJECT_FRAME_SIZE = _FRAME_PREFIX.size + _OBJECT_FIELDS.size + 1
+
+@METRICS.timed("husky.parse_frame")
+def decode_detection_frame(data: bytes, timestamp: float = 0.0, sequence: int = 0) -> DetectionFrame:
+    """فك ترميز الكائنات مباشرة إلى DetectionFrame مع التحقق المتجه من المجموع"""
+    if (len(data) >= _OBJECT_FRAME_SIZE and data[4] == HuskyLens.COMMAND_RETURN_INFO
+            and (len(data) - _OBJECT_FRAME_SIZE) % _OBJECT_FRAME_SIZE == 0):
+        # المسار السريع: كل الإطارات بنفس الحجم، نعاملها كمصفوفة (N, 16)
+        rows = np.frombuffer(data, dtype=np.uint8)[_OBJECT_FRAME_SIZE:].reshape(-1, _OBJECT_FRAME_SIZE)
+        header = np.frombuffer(HuskyLens.FRAME_HEADER, dtype=np.uint8)
+        if (rows[:, :3] == header).all() and (rows[:, 3] == _OBJECT_FIELDS.size).all():
+            checksum_ok = (rows[:, :-1].sum(axis=1) & 0xFF) == rows[:, -1]
+            if METRICS.enabled and not checksum_ok.all():
+                METRICS.increment("husky.checksum_errors", int((~checksum_ok).sum()))
+            valid = checksum_ok & (rows[:, 4] == HuskyLens.COMMAND_RETURN_BLOCK)
+            fields = np.ascontiguousarray(rows[valid, _FRAME_PREFIX.size:-1])
+            return DetectionFrame(fields.view(BLOCK_DTYPE).reshape(-1), timestamp, sequence)
+    
+    # المسار العام: إطارات بأحجام مختلفة أو بيانات تحتاج إعادة مزامنة
+    records = [_OBJECT_FIELDS.unpack_from(payload) for command, payload in iter_frames(data)
+               if command == HuskyLens.COMMAND_RETURN_BLOCK and len(payload) >= _OBJECT_FIELDS.size]
+    return DetectionFrame(np.array(records, dtype=BLOCK_DTYPE), timestamp, sequence)
+
+@METRICS.timed("husky.parse_arrows")
+def decode_arrows(data: bytes) -> List[Tuple[int, int, int, int]]:
+    """فك ترميز إطارات الأسهم (من الذيل إلى الرأس) من الرد"""
+    arrows = []
+    for command, payload in iter_frames(data):
+        if command != HuskyLens.COMMAND_RETURN_ARROW or len(payload) < _OBJECT_FIELDS.size:
+            continue
+        x_tail, y_tail, x_head, y_head, _ = _OBJECT_FIELDS.unpack_from(payload)
+        arrows.append((x_tail, y_tail, x_head, y_head))
+    return arrows
+
 class HuskyLens:
     """كلاس التحكم الرئيسي في HUSKYLENS"""
     
@@ -48,6 +331,18 @@ class HuskyLens:
     QR_CODE_RECOGNITION = 0x07
     BARCODE_RECOGNITION = 0x08
     
+    ALGORITHM_NAMES = {
+        FACE_RECOGNITION: "التعرف على الوجوه",
+        OBJECT_TRACKING: "تتبع الكائنات",
+        OBJECT_RECOGNITION: "التعرف على الكائنات",
+        LINE_TRACKING: "تتبع الخطوط",
+        COLOR_RECOGNITION: "التعرف على الألوان",
+        TAG_RECOGNITION: "التعرف على العلامات",
+        OBJECT_CLASSIFICATION: "تصنيف الكائنات",
+        QR_CODE_RECOGNITION: "قراءة رمز QR",
+        BARCODE_RECOGNITION: "قراءة الباركود"
+    }
+    
     # أوامر البروتوكول
     COMMAND_REQUEST = 0x20
     COMMAND_REQUEST_BLOCKS = 0x21
@@ -56,80 +351,216 @@ class HuskyLens:
     COMMAND_LEARNED_ARROWS = 0x24
     COMMAND_BLOCKS_LEARNED = 0x25
     COMMAND_ARROWS_LEARNED = 0x26
+    COMMAND_REQUEST_KNOCK = 0x2C
     COMMAND_ALGORITHM = 0x2D
+    COMMAND_REQUEST_CUSTOMNAMES = 0x2F
+    COMMAND_REQUEST_LEARN = 0x36
+    COMMAND_REQUEST_FORGET = 0x37
+    
+    # أوامر الرد من HUSKYLENS
+    COMMAND_RETURN_INFO = 0x29
+    COMMAND_RETURN_BLOCK = 0x2A
+    COMMAND_RETURN_ARROW = 0x2B
+    COMMAND_RETURN_OK = 0x2E
+    
+    # ترويسة الإطار: 55 AA ثم عنوان الجهاز 11
+    FRAME_HEADER = b'\x55\xAA\x11'
     
-    def __init__(self, port: str = 'COM3', baudrate: int = 9600):
+    # أقصى طول لاسم مخصص (بايت) يقبله HUSKYLENS
+    MAX_NAME_LENGTH = 20
+    
+    # سرعات الاتصال التي يدعمها HUSKYLENS (من الأسرع إلى الأبطأ)
+    SUPPORTED_BAUDRATES = (1000000, 115200, 9600)
+    
+    def __init__(self, port: str = 'COM3', baudrate: int = 9600,
+                 auto_baudrate: bool = False, ready_timeout: float = 2.0,
+                 transport: Optional[Transport] = None):
         """
         إنشاء اتصال جديد مع HUSKYLENS
         
         Args:
             port: منفذ الاتصال التسلسلي (مثل COM3)
             baudrate: سرعة الاتصال (افتراضي 9600)
+            auto_baudrate: تجربة السرعات المدعومة واختيار أسرع سرعة يستجيب عليها الجهاز
+            ready_timeout: أقصى مدة (بالثواني) لانتظار جاهزية الجهاز عند الاتصال
+            transport: ناقل بديل للمنفذ التسلسلي (تسجيل أو إعادة تشغيل جلسة، انظر transport.py)
         """
         self.port = port
+        self.transport = transport
         self.baudrate = baudrate
+        self.auto_baudrate = auto_baudrate
+        self.ready_timeout = ready_timeout
         self.serial = None
-        self.current_algorithm = None
+        self.current_algorithm = None  # آخر خوارزمية أكدها الجهاز
+        self.last_switch_duration = 0.0  # مدة آخر تغيير خوارزمية (ثوانٍ)
+        self.last_latency = 0.0  # زمن آخر رحلة ذهاب وإياب على المنفذ (ثوانٍ)
+        
+        # قفل المنفذ التسلسلي ومتغيرات وضع البث المستمر
+        self._io_lock = threading.Lock()
+        self._stream_thread: Optional[threading.Thread] = None
+        self._stream_running = False
+        self._frame_buffer = LatestFrameBuffer()
+        self.stream_errors = 0
         
     def connect(self) -> bool:
         """إنشاء اتصال مع HUSKYLENS"""
         try:
-            self.serial = serial.Serial(self.port, self.baudrate, timeout=1)
-            time.sleep(2)  # انتظار للتأكد من الاتصال
-            print(f"✅ تم الاتصال بـ HUSKYLENS على {self.port}")
+            if self.transport is not None:
+                self.serial = self.transport
+            else:
+                self.serial = SerialTransport(self.port, self.baudrate, timeout=1)
+            self.serial.open()
+            self.current_algorithm = None
+            
+            if self.auto_baudrate:
+                baudrate = self.detect_baudrate(timeout=self.ready_timeout)
+                if baudrate is None:
+                    raise HuskyLensError("لم يستجب الجهاز على أي سرعة مدعومة")
+            elif not self.wait_until_ready(self.ready_timeout):
+                raise HuskyLensError("لم يستجب الجهاز لأمر الجاهزية")
+            
+            print(f"✅ تم الاتصال بـ HUSKYLENS على {self.port} بسرعة {self.baudrate}")
             return True
         except Exception as e:
             print(f"❌ خطأ في الاتصال: {e}")
+            if self.serial and self.serial.is_open:
+                self.serial.close()
+            return False
+    
+    def knock(self, timeout: float = 0.1) -> bool:
+        """إرسال أمر الطرق (knock) والتحقق من رد الجهاز بـ OK"""
+        previous_timeout = self.serial.timeout
+        self.serial.timeout = timeout
+        try:
+            response = self._send_command(self.COMMAND_REQUEST_KNOCK)
+            return response[4] == self.COMMAND_RETURN_OK
+        except HuskyLensError:
             return False
+        finally:
+            self.serial.timeout = previous_timeout
+    
+    def wait_until_ready(self, timeout: float = 2.0) -> bool:
+        """انتظار جاهزية الجهاز بتكرار أمر الطرق بدلاً من انتظار ثابت"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.knock():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+    
+    def detect_baudrate(self, baudrates: Optional[Tuple[int, ...]] = None,
+                        timeout: float = 0.0) -> Optional[int]:
+        """تجربة السرعات المدعومة (وتكرارها حتى انقضاء timeout) واختيار أسرع سرعة يستجيب عليها الجهاز"""
+        deadline = time.monotonic() + timeout
+        while True:
+            for baudrate in baudrates or self.SUPPORTED_BAUDRATES:
+                self.serial.baudrate = baudrate
+                if self.knock():
+                    self.baudrate = baudrate
+                    return baudrate
+            if time.monotonic() >= deadline:
+                break
+        
+        # إرجاع المنفذ إلى السرعة الأصلية عند الفشل
+        self.serial.baudrate = self.baudrate
+        return None
     
     def disconnect(self):
         """قطع الاتصال مع HUSKYLENS"""
+        self.stop_streaming()
         if self.serial and self.serial.is_open:
             self.serial.close()
             print("🔌 تم قطع الاتصال مع HUSKYLENS")
     
     def _send_command(self, command: int, data: bytes = b'') -> bytes:
-        """إرسال أمر إلى HUSKYLENS"""
+        """إرسال أمر إلى HUSKYLENS وقراءة الرد كاملاً"""
+        return self._send_commands([(command, data)])[0]
+    
+    @METRICS.timed("husky.serial_io")
+    def _send_commands(self, commands: List[Tuple[int, bytes]]) -> List[bytes]:
+        """إرسال عدة أوامر متتالية في كتابة واحدة وقراءة ردودها بالترتيب"""
         if not self.serial or not self.serial.is_open:
             raise HuskyLensError("لا يوجد اتصال مع HUSKYLENS")
         
-        # تحضير الحزمة
-        header = b'\x55\xAA\x11\x00'
-        length = len(data)
-        checksum = (0x55 + 0xAA + 0x11 + 0x00 + command + length + sum(data)) & 0xFF
-        
-        packet = header + struct.pack('BB', command, length) + data + struct.pack('B', checksum)
+        # تحضير الحزم: 55 AA 11 الطول الأمر البيانات المجموع
+        packet = b''.join(build_packet(command, data) for command, data in commands)
         
-        # إرسال الأمر
-        self.serial.write(packet)
-        time.sleep(0.1)
+        with self._io_lock:
+            # تجاهل أي بقايا قديمة ثم إرسال كل الأوامر دفعة واحدة
+            self.serial.reset_input_buffer()
+            start = time.monotonic()
+            self.serial.write(packet)
+            try:
+                responses = [self._read_response() for _ in commands]
+            except HuskyLensError:
+                # بقية الرد التالف لا تخص الأمر التالي
+                self.serial.reset_input_buffer()
+                raise
+            self.last_latency = time.monotonic() - start
+            return responses
+    
+    def _read_response(self) -> bytes:
+        """قراءة رد أمر واحد: الإطار الأول وكل إطارات الكائنات التي تليه"""
+        # قراءة الرد إطاراً بإطار بدلاً من الانتظار الثابت
+        first = self._read_frame()
+        response = bytearray(first)
+        # إطار المعلومات يحدد عدد إطارات الكائنات التالية
+        for _ in range(pending_frame_count(first)):
+            response += self._read_frame()
+        return bytes(response)
+    
+    def _read_exact(self, size: int) -> bytes:
+        """قراءة عدد محدد من البايتات أو إطلاق استثناء عند انتهاء المهلة"""
+        data = self.serial.read(size)
+        if len(data) != size:
+            METRICS.increment("husky.timeouts")
+            raise HuskyLensError("انتهت مهلة انتظار الرد من HUSKYLENS")
+        return data
+    
+    def _read_frame(self) -> bytes:
+        """قراءة إطار واحد كامل (الترويسة + الطول + الأمر + البيانات + المجموع)"""
+        # مزامنة على الترويسة 55 AA 11 مع تجاوز أي بايتات عشوائية
+        header = self.FRAME_HEADER
+        matched = 0
+        while matched < len(header):
+            byte = self._read_exact(1)[0]
+            if byte == header[matched]:
+                matched += 1
+            else:
+                matched = 1 if byte == header[0] else 0
         
-        # قراءة الرد
-        response = self.serial.read(1024)
-        return response
+        length, command = self._read_exact(2)
+        payload = self._read_exact(length + 1)
+        return header + bytes((length, command)) + payload
     
-    def set_algorithm(self, algorithm: int) -> bool:
-        """تغيير خوارزمية الكشف"""
+    def set_algorithm(self, algorithm: int, force: bool = False) -> bool:
+        """
+        تغيير خوارزمية الكشف
+        
+        Args:
+            algorithm: الخوارزمية المطلوبة (مثل HuskyLens.FACE_RECOGNITION)
+            force: إرسال الأمر حتى لو كانت الخوارزمية مفعلة مسبقاً
+        """
+        if algorithm == self.current_algorithm and not force:
+            # الخوارزمية مؤكدة على الجهاز - لا داعي لإعادة تحميل النموذج
+            return True
+        
         try:
+            start = time.monotonic()
             data = struct.pack('B', algorithm)
             response = self._send_command(self.COMMAND_ALGORITHM, data)
-            self.current_algorithm = algorithm
+            if response[4] != self.COMMAND_RETURN_OK:
+                raise HuskyLensError("لم يؤكد الجهاز تغيير الخوارزمية")
             
-            algorithm_names = {
-                self.FACE_RECOGNITION: "التعرف على الوجوه",
-                self.OBJECT_TRACKING: "تتبع الكائنات", 
-                self.OBJECT_RECOGNITION: "التعرف على الكائنات",
-                self.LINE_TRACKING: "تتبع الخطوط",
-                self.COLOR_RECOGNITION: "التعرف على الألوان",
-                self.TAG_RECOGNITION: "التعرف على العلامات",
-                self.OBJECT_CLASSIFICATION: "تصنيف الكائنات",
-                self.QR_CODE_RECOGNITION: "قراءة رمز QR",
-                self.BARCODE_RECOGNITION: "قراءة الباركود"
-            }
+            # الرد يصل بعد انتهاء الجهاز من تحميل النموذج
+            self.last_switch_duration = time.monotonic() - start
+            self.current_algorithm = algorithm
             
-            print(f"🔄 تم تغيير الوضع إلى: {algorithm_names.get(algorithm, 'غير معروف')}")
+            print(f"🔄 تم تغيير الوضع إلى: {self.ALGORITHM_NAMES.get(algorithm, 'غير معروف')}")
             return True
         except Exception as e:
+            # حالة الجهاز غير مؤكدة بعد الفشل
+            self.current_algorithm = None
             print(f"❌ خطأ في تغيير الخوارزمية: {e}")
             return False
     
@@ -138,6 +569,7 @@ class HuskyLens:
         try:
             response = self._send_command(self.COMMAND_REQUEST_BLOCKS)
             objects = self._parse_blocks(response)
+            METRICS.mark("husky.frames")
             return objects
         except Exception as e:
             print(f"❌ خطأ في قراءة الكائنات: {e}")
@@ -153,53 +585,129 @@ class HuskyLens:
             print(f"❌ خطأ في قراءة الأسهم: {e}")
             return []
     
-    def _parse_blocks(self, data: bytes) -> List[HuskyLensObject]:
-        """تحليل بيانات الكائنات من الاستجابة"""
-        objects = []
-        if len(data) < 8:
-            return objects
-        
-        # تحليل مبسط - يحتاج تطوير حسب بروتوكول HUSKYLENS الفعلي
+    def batch(self) -> CommandBatch:
+        """بدء دفعة أوامر تُرسل كلها في رحلة تسلسلية واحدة"""
+        return CommandBatch(self)
+    
+    def get_frame(self) -> DetectionFrame:
+        """الحصول على الكائنات المكتشفة كإطار مضغوط (DetectionFrame)"""
         try:
-            # هذا مثال مبسط، يجب تطويره حسب البروتوكول الفعلي
-            for i in range(0, len(data) - 10, 10):
-                if data[i:i+2] == b'\x55\xAA':
-                    x = struct.unpack('<H', data[i+4:i+6])[0]
-                    y = struct.unpack('<H', data[i+6:i+8])[0]
-                    w = struct.unpack('<H', data[i+8:i+10])[0]
-                    h = struct.unpack('<H', data[i+10:i+12])[0] if i+12 <= len(data) else 50
-                    
-                    obj = HuskyLensObject("detected", x, y, w, h)
-                    objects.append(obj)
-        except:
-            pass
+            response = self._send_command(self.COMMAND_REQUEST_BLOCKS)
+            METRICS.mark("husky.frames")
+            return decode_detection_frame(response, time.monotonic())
+        except Exception as e:
+            print(f"❌ خطأ في قراءة الكائنات: {e}")
+            return DetectionFrame()
+    
+    def request_all(self) -> Tuple[DetectionFrame, List[Tuple[int, int, int, int]]]:
+        """طلب كل الكائنات والأسهم في رحلة واحدة (يطلق HuskyLensError عند الفشل)"""
+        response = self._send_command(self.COMMAND_REQUEST)
+        METRICS.mark("husky.frames")
+        return decode_detection_frame(response, time.monotonic()), self._parse_arrows(response)
+    
+    def start_streaming(self, interval: float = 0.0) -> bool:
+        """بدء خيط خلفي يقرأ الكائنات والأسهم باستمرار وينشر أحدث إطار"""
+        if not self.serial or not self.serial.is_open:
+            print("❌ لا يمكن بدء البث بدون اتصال")
+            return False
+        if self._stream_running:
+            return True
         
-        return objects
+        self._stream_running = True
+        self._stream_thread = threading.Thread(target=self._stream_loop, args=(interval,),
+                                               name=f"huskylens-{self.port}", daemon=True)
+        self._stream_thread.start()
+        return True
+    
+    def stop_streaming(self):
+        """إيقاف خيط البث الخلفي وانتظار انتهائه"""
+        self._stream_running = False
+        if self._stream_thread is not None:
+            self._stream_thread.join()
+            self._stream_thread = None
+    
+    @property
+    def is_streaming(self) -> bool:
+        """هل خيط البث الخلفي يعمل؟"""
+        return self._stream_running
+    
+    def get_latest_frame(self) -> Optional[StreamFrame]:
+        """أحدث إطار نشره خيط البث (None إذا لم يصل أي إطار بعد)"""
+        return self._frame_buffer.latest()
+    
+    def _stream_loop(self, interval: float):
+        """حلقة خيط البث: طلب كامل (كائنات + أسهم) ثم نشر النتيجة"""
+        sequence = 0
+        while self._stream_running:
+            try:
+                blocks, arrows = self.request_all()
+            except HuskyLensError:
+                self.stream_errors += 1
+                if not self.serial or not self.serial.is_open:
+                    break
+                continue
+            except Exception:
+                # المنفذ أُغلق أو فُصل الجهاز
+                self.stream_errors += 1
+                break
+            
+            sequence += 1
+            self._frame_buffer.publish(StreamFrame(sequence, time.monotonic(), blocks, arrows))
+            if interval > 0:
+                time.sleep(interval)
+        
+        self._stream_running = False
+    
+    def _parse_blocks(self, data: bytes) -> List[HuskyLensObject]:
+        """تحليل بيانات الكائنات من الاستجابة"""
+        return decode_blocks(data)
     
     def _parse_arrows(self, data: bytes) -> List[Tuple[int, int, int, int]]:
         """تحليل بيانات الأسهم من الاستجابة"""
-        arrows = []
-        # تحليل مبسط - يحتاج تطوير حسب بروتوكول HUSKYLENS الفعلي
-        return arrows
+        return decode_arrows(data)
     
     def learn_object(self, object_id: int = 1) -> bool:
-        """تعلم كائن جديد"""
+        """تعلم الكائن المعروض حالياً أمام الكاميرا بالمعرف المحدد"""
         try:
-            # هذا يحتاج تطوير حسب البروتوكول الفعلي
+            response = self._send_command(self.COMMAND_REQUEST_LEARN, struct.pack('<H', object_id))
+            if response[4] != self.COMMAND_RETURN_OK:
+                raise HuskyLensError("لم يؤكد الجهاز تعلم الكائن")
             print(f"🧠 تعلم كائن جديد بالمعرف {object_id}")
             return True
         except Exception as e:
             print(f"❌ خطأ في تعلم الكائن: {e}")
             return False
     
-    def forget_object(self, object_id: int = 1) -> bool:
-        """نسيان كائن متعلم"""
+    def forget_objects(self) -> bool:
+        """نسيان كل الكائنات المتعلمة في الخوارزمية الحالية (البروتوكول لا يدعم نسيان معرف واحد)"""
         try:
-            print(f"🗑️ تم نسيان الكائن {object_id}")
+            response = self._send_command(self.COMMAND_REQUEST_FORGET)
+            if response[4] != self.COMMAND_RETURN_OK:
+                raise HuskyLensError("لم يؤكد الجهاز نسيان الكائنات")
+            print(f"🗑️ تم نسيان كل كائنات: {self.ALGORITHM_NAMES.get(self.current_algorithm, 'الخوارزمية الحالية')}")
             return True
         except Exception as e:
-            print(f"❌ خطأ في نسيان الكائن: {e}")
+            print(f"❌ خطأ في نسيان الكائنات: {e}")
             return False
+    
+    def set_custom_name(self, object_id: int, name: str) -> bool:
+        """تعيين اسم يظهر على شاشة HUSKYLENS لمعرف متعلم"""
+        try:
+            response = self._send_command(self.COMMAND_REQUEST_CUSTOMNAMES, encode_custom_name(object_id, name))
+            if response[4] != self.COMMAND_RETURN_OK:
+                raise HuskyLensError("لم يؤكد الجهاز الاسم")
+            return True
+        except Exception as e:
+            print(f"❌ خطأ في تعيين الاسم: {e}")
+            return False
+    
+    def get_learned_count(self) -> int:
+        """عدد المعرفات المتعلمة في الخوارزمية الحالية (-1 عند الفشل)"""
+        try:
+            return decode_info(self._send_command(self.COMMAND_REQUEST))[1]
+        except Exception as e:
+            print(f"❌ خطأ في قراءة المعلومات: {e}")
+            return -1
 
     def take_screenshot(self, filename: str = "huskylens_screenshot.jpg") -> bool:
         """أخذ لقطة شاشة من HUSKYLENS"""
@@ -0,0 +1,211 @@
+"""
+إدارة عدة عدسات HUSKYLENS معاً
+Multi-lens manager for HUSKYLENS
+
+يستطلع كل العدسات بالتوازي ويجمع إطاراتها في لقطات متزامنة زمنياً
+مع إحصائيات الأداء لكل جهاز.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+from huskylens import HuskyLens, HuskyLensError, StreamFrame
+
+class ArraySnapshot(NamedTuple):
+    """لقطة متزامنة من كل العدسات"""
+    timestamp: float
+    frames: Dict[str, StreamFrame]
+    skew: float  # الفرق بين أقدم وأحدث إطار في اللقطة (ثوانٍ)
+
+class DeviceStats:
+    """إحصائيات الإنتاجية وزمن الاستجابة لجهاز واحد"""
+    
+    def __init__(self, window: int = 100):
+        self.frames = 0
+        self.errors = 0
+        self.started = time.monotonic()
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()  # العامل يسجل بينما يقرأ خيط آخر الملخص
+    
+    def record(self, latency: float):
+        """تسجيل طلب ناجح"""
+        with self._lock:
+            self.frames += 1
+            self.latencies.append(latency)
+    
+    def summary(self) -> dict:
+        """ملخص الإحصائيات بالإطارات/ثانية والمللي ثانية"""
+        elapsed = time.monotonic() - self.started
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if latencies:
+            mean_ms = sum(latencies) / len(latencies) * 1000
+            p95_ms = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+            max_ms = latencies[-1] * 1000
+        else:
+            mean_ms = p95_ms = max_ms = 0.0
+        return {
+            "frames": self.frames,
+            "errors": self.errors,
+            "fps": self.frames / elapsed if elapsed > 0 else 0.0,
+            "latency_mean_ms": mean_ms,
+            "latency_p95_ms": p95_ms,
+            "latency_max_ms": max_ms,
+        }
+
+class HuskyLensArray:
+    """مدير لعدة عدسات يستطلعها بالتوازي على مجمع خيوط"""
+    
+    def __init__(self, devices: Dict[str, HuskyLens], history: int = 8):
+        """
+        إنشاء مدير العدسات
+        
+        Args:
+            devices: قاموس اسم الجهاز -> كائن HuskyLens
+            history: عدد الإطارات المحفوظة لكل جهاز لأغراض المحاذاة الزمنية
+        """
+        self.devices = devices
+        self.history: Dict[str, Deque[StreamFrame]] = {name: deque(maxlen=history) for name in devices}
+        # العمال يضيفون إلى السجلات أثناء قراءتها: القراءة تنسخها تحت القفل
+        self._history_lock = threading.Lock()
+        self.stats: Dict[str, DeviceStats] = {name: DeviceStats() for name in devices}
+        self._sequences: Dict[str, int] = {name: 0 for name in devices}
+        # ضعف عدد الأجهزة: عامل مستمر لكل جهاز + مكان للأوامر الفردية أثناء الاستطلاع
+        self._executor = ThreadPoolExecutor(max_workers=max(1, 2 * len(devices)),
+                                            thread_name_prefix="huskylens-array")
+        self._running = False
+        self._workers = []
+    
+    @classmethod
+    def from_ports(cls, ports: List[str], baudrate: int = 9600, **kwargs) -> 'HuskyLensArray':
+        """إنشاء مدير من قائمة منافذ (اسم كل جهاز هو اسم منفذه)"""
+        return cls({port: HuskyLens(port, baudrate) for port in ports}, **kwargs)
+    
+    def connect(self) -> bool:
+        """الاتصال بكل العدسات بالتوازي"""
+        results = list(self._executor.map(lambda husky: husky.connect(), self.devices.values()))
+        return all(results)
+    
+    def disconnect(self):
+        """إيقاف الاستطلاع وقطع الاتصال مع كل العدسات"""
+        self.stop()
+        for husky in self.devices.values():
+            husky.disconnect()
+        self._executor.shutdown(wait=True)
+    
+    def set_algorithm(self, algorithm: int) -> bool:
+        """تغيير الخوارزمية في كل العدسات بالتوازي"""
+        results = list(self._executor.map(lambda husky: husky.set_algorithm(algorithm),
+                                          self.devices.values()))
+        return all(results)
+    
+    def _poll_device(self, name: str) -> Optional[StreamFrame]:
+        """طلب إطار واحد من جهاز وتسجيل زمنه وإحصائياته"""
+        husky = self.devices[name]
+        stats = self.stats[name]
+        start = time.monotonic()
+        try:
+            blocks, arrows = husky.request_all()
+        except (HuskyLensError, OSError):
+            stats.errors += 1
+            return None
+        
+        # الطابع الزمني هو لحظة اكتمال الرد
+        timestamp = time.monotonic()
+        stats.record(timestamp - start)
+        self._sequences[name] += 1
+        frame = StreamFrame(self._sequences[name], timestamp, blocks, arrows)
+        with self._history_lock:
+            self.history[name].append(frame)
+        return frame
+    
+    def poll(self) -> ArraySnapshot:
+        """استطلاع كل العدسات مرة واحدة بالتوازي وإرجاع لقطة"""
+        names = list(self.devices)
+        frames = self._executor.map(self._poll_device, names)
+        return self._make_snapshot({name: frame for name, frame in zip(names, frames)
+                                    if frame is not None})
+    
+    def start(self, interval: float = 0.0):
+        """بدء استطلاع مستمر: عامل لكل جهاز على مجمع الخيوط"""
+        if self._running:
+            return
+        self._running = True
+        self._workers = [self._executor.submit(self._device_loop, name, interval)
+                         for name in self.devices]
+    
+    def stop(self):
+        """إيقاف الاستطلاع المستمر وانتظار العمال"""
+        self._running = False
+        for worker in self._workers:
+            worker.result()
+        self._workers = []
+    
+    def _device_loop(self, name: str, interval: float):
+        """حلقة عامل جهاز واحد"""
+        while self._running:
+            self._poll_device(name)
+            if interval > 0:
+                time.sleep(interval)
+    
+    def _copy_history(self) -> Dict[str, List[StreamFrame]]:
+        """نسخة ثابتة من سجل إطارات كل جهاز"""
+        with self._history_lock:
+            return {name: list(frames) for name, frames in self.history.items()}
+    
+    def latest_snapshot(self) -> ArraySnapshot:
+        """أحدث إطار متاح من كل جهاز بغض النظر عن المحاذاة"""
+        return self._make_snapshot({name: frames[-1] for name, frames in self._copy_history().items()
+                                    if frames})
+    
+    def aligned_snapshot(self, timestamp: Optional[float] = None,
+                         max_skew: float = 0.05) -> Optional[ArraySnapshot]:
+        """
+        لقطة متزامنة: لكل جهاز الإطار الأقرب إلى اللحظة المطلوبة
+        
+        Args:
+            timestamp: اللحظة المرجعية (time.monotonic)، الافتراضي أقدم "أحدث إطار" بين الأجهزة
+            max_skew: أقصى فرق زمني مسموح بين إطارات اللقطة
+        
+        Returns:
+            اللقطة، أو None إذا غاب جهاز أو تجاوز الفرق max_skew
+        """
+        history = self._copy_history()
+        histories = list(history.values())
+        if not histories or not all(histories):
+            return None
+        
+        if timestamp is None:
+            # أحدث لحظة تملك فيها كل الأجهزة إطاراً
+            timestamp = min(frames[-1].timestamp for frames in histories)
+        
+        frames = {name: min(device_frames, key=lambda frame: abs(frame.timestamp - timestamp))
+                  for name, device_frames in history.items()}
+        snapshot = self._make_snapshot(frames, timestamp)
+        if snapshot.skew > max_skew:
+            return None
+        return snapshot
+    
+    def _make_snapshot(self, frames: Dict[str, StreamFrame],
+                       timestamp: Optional[float] = None) -> ArraySnapshot:
+        """بناء لقطة وحساب الفرق الزمني بين إطاراتها"""
+        if not frames:
+            return ArraySnapshot(timestamp or time.monotonic(), {}, 0.0)
+        times = [frame.timestamp for frame in frames.values()]
+        if timestamp is None:
+            timestamp = max(times)
+        return ArraySnapshot(timestamp, frames, max(times) - min(times))
+    
+    def get_stats(self) -> Dict[str, dict]:
+        """إحصائيات كل جهاز (إطارات/ثانية، زمن الاستجابة، الأخطاء)"""
+        return {name: stats.summary() for name, stats in self.stats.items()}
+    
+    def slowest_device(self) -> Optional[str]:
+        """الجهاز صاحب أعلى متوسط زمن استجابة (عنق الزجاجة)"""
+        summaries = self.get_stats()
+        if not summaries:
+            return None
+        return max(summaries, key=lambda name: summaries[name]["latency_mean_ms"])
@@ -0,0 +1,295 @@
+"""
+قياسات الأداء لـ HUSKYLENS والروبوت الذكي
+Hot-path instrumentation and metrics
+
+مدرجات تكرارية للأزمنة (p50/p95/p99)، عدادات للأخطاء، ومعدل الإطارات،
+مع مصدّرين: نص Prometheus عبر HTTP محلي، أو ملف JSON دوري.
+القياسات معطلة افتراضياً، وعندها لا تكلف الخطافات سوى فحص متغير واحد:
+
+    from metrics import METRICS, PrometheusExporter
+    METRICS.enable()
+    PrometheusExporter(METRICS, port=9108).start()
+"""
+
+import bisect
+import functools
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+def _default_buckets() -> List[float]:
+    """حدود الدلاء بالثواني بسلسلة 1-2-5 من 10 ميكروثانية إلى 10 ثوانٍ"""
+    bounds = []
+    for exponent in range(-5, 1):
+        for step in (1, 2, 5):
+            bounds.append(step * 10.0 ** exponent)
+    bounds.append(10.0)
+    return bounds
+
+class Histogram:
+    """مدرج تكراري بدلاء ثابتة: إضافة O(log دلاء) ونسب مئوية تقريبية"""
+    
+    def __init__(self, buckets: Optional[List[float]] = None):
+        self.bounds = buckets or _default_buckets()
+        self.counts = [0] * (len(self.bounds) + 1)  # الدلو الأخير لما فوق آخر حد
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float):
+        """تسجيل قيمة (بالثواني)"""
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+    
+    def copy(self) -> "Histogram":
+        """نسخة متسقة تؤخذ تحت القفل حتى يُنسق التصدير دون سباق مع observe"""
+        snapshot = Histogram(self.bounds)
+        with self._lock:
+            snapshot.counts = list(self.counts)
+            snapshot.count = self.count
+            snapshot.total = self.total
+            snapshot.max = self.max
+        return snapshot
+    
+    def percentile(self, fraction: float) -> float:
+        """نسبة مئوية تقريبية بالاستيفاء الخطي داخل الدلو"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.max
+    
+    def summary(self) -> dict:
+        """ملخص بالمللي ثانية"""
+        snapshot = self.copy()
+        return {
+            "count": snapshot.count,
+            "mean_ms": snapshot.total / snapshot.count * 1000 if snapshot.count else 0.0,
+            "p50_ms": snapshot.percentile(0.50) * 1000,
+            "p95_ms": snapshot.percentile(0.95) * 1000,
+            "p99_ms": snapshot.percentile(0.99) * 1000,
+            "max_ms": snapshot.max * 1000,
+        }
+
+class RateMeter:
+    """معدل الأحداث في الثانية على نافذة منزلقة"""
+    
+    def __init__(self, window: float = 5.0):
+        self.window = window
+        self.count = 0
+        self._events = deque()
+        self._lock = threading.Lock()
+    
+    def mark(self, now: float):
+        with self._lock:
+            self.count += 1
+            self._events.append(now)
+            horizon = now - self.window
+            while self._events[0] < horizon:
+                self._events.popleft()
+    
+    def rate(self) -> float:
+        with self._lock:
+            if len(self._events) < 2:
+                return 0.0
+            span = self._events[-1] - self._events[0]
+            return (len(self._events) - 1) / span if span > 0 else 0.0
+
+class MetricsRegistry:
+    """سجل مركزي للمدرجات والعدادات ومعدلات الإطارات"""
+    
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.meters: Dict[str, RateMeter] = {}
+        self._lock = threading.Lock()
+    
+    def enable(self):
+        self.enabled = True
+    
+    def disable(self):
+        self.enabled = False
+    
+    def reset(self):
+        """مسح كل القياسات"""
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.meters.clear()
+    
+    def observe(self, name: str, seconds: float):
+        """تسجيل زمن في مدرج"""
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        histogram.observe(seconds)
+    
+    def increment(self, name: str, amount: int = 1):
+        """زيادة عداد (أخطاء المجموع الاختباري، انتهاء المهلة...)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def mark(self, name: str):
+        """تسجيل حدث لحساب معدله (مثل الإطارات في الثانية)"""
+        if not self.enabled:
+            return
+        meter = self.meters.get(name)
+        if meter is None:
+            with self._lock:
+                meter = self.meters.setdefault(name, RateMeter())
+        meter.mark(time.monotonic())
+    
+    def _items(self):
+        """نسخ القواميس تحت القفل حتى لا يتغير حجمها أثناء التصدير"""
+        with self._lock:
+            return list(self.histograms.items()), dict(self.counters), list(self.meters.items())
+    
+    def snapshot(self) -> dict:
+        """كل القياسات الحالية كقاموس قابل للتحويل إلى JSON"""
+        histograms, counters, meters = self._items()
+        return {
+            "timestamp": time.time(),
+            "latency": {name: histogram.summary() for name, histogram in histograms},
+            "counters": counters,
+            "rates": {name: {"count": meter.count, "per_second": meter.rate()}
+                      for name, meter in meters},
+        }
+    
+    def to_prometheus(self, prefix: str = "huskylens") -> str:
+        """القياسات بصيغة نص Prometheus"""
+        def metric_name(name: str) -> str:
+            return f"{prefix}_{name}".replace('.', '_').replace('-', '_')
+        
+        histograms, counters, meters = self._items()
+        lines = []
+        for name, histogram in histograms:
+            histogram = histogram.copy()
+            base = metric_name(name) + "_seconds"
+            lines.append(f"# TYPE {base} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                lines.append(f'{base}_bucket{{le="{bound:g}"}} {cumulative}')
+            lines.append(f'{base}_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f"{base}_sum {histogram.total}")
+            lines.append(f"{base}_count {histogram.count}")
+        for name, value in counters.items():
+            base = metric_name(name) + "_total"
+            lines.append(f"# TYPE {base} counter")
+            lines.append(f"{base} {value}")
+        for name, meter in meters:
+            base = metric_name(name) + "_per_second"
+            lines.append(f"# TYPE {base} gauge")
+            lines.append(f"{base} {meter.rate()}")
+        return "\n".join(lines) + "\n"
+    
+    def timed(self, name: str):
+        """مزخرف لقياس زمن دالة؛ عند التعطيل يستدعي الدالة مباشرة"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+# السجل المشترك الذي تستخدمه كل الخطافات في المكتبة
+METRICS = MetricsRegistry()
+
+class PrometheusExporter:
+    """خادم HTTP محلي يعرض القياسات على /metrics بصيغة Prometheus"""
+    
+    def __init__(self, registry: MetricsRegistry = METRICS, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+    
+    def start(self) -> int:
+        """بدء الخادم في خيط خلفي وإرجاع رقم المنفذ"""
+        registry = self.registry
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True,
+                         name="huskylens-metrics").start()
+        return self.port
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+class JsonFileExporter:
+    """كتابة لقطة القياسات في ملف JSON كل فترة"""
+    
+    def __init__(self, path: str, registry: MetricsRegistry = METRICS, interval: float = 10.0):
+        self.path = path
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def dump(self):
+        """كتابة لقطة واحدة الآن"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.registry.snapshot(), f, ensure_ascii=False, indent=2)
+    
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="huskylens-metrics-json")
+        self._thread.start()
+    
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+    
+    def stop(self):
+        """إيقاف الكتابة الدورية مع كتابة لقطة أخيرة"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.dump()
@@ -0,0 +1,270 @@
+"""
+سجل دائم للكائنات المتعلمة
+Persistent learned-object registry
+
+يحفظ المعرفات المتعلمة وأسماءها لكل خوارزمية في ملف JSON، ويدفعها إلى
+HUSKYLENS دفعة واحدة أو يسحبها منه. يتذكر السجل آخر حالة أرسلها لكل جهاز،
+فلا يُرسل عند المزامنة إلا ما تغير.
+"""
+
+import json
+import os
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from huskylens import HuskyLens, HuskyLensError
+
+# الخوارزميات التي تدعم تعلم المعرفات
+LEARNABLE_ALGORITHMS = (
+    HuskyLens.FACE_RECOGNITION,
+    HuskyLens.OBJECT_TRACKING,
+    HuskyLens.OBJECT_RECOGNITION,
+    HuskyLens.LINE_TRACKING,
+    HuskyLens.COLOR_RECOGNITION,
+    HuskyLens.TAG_RECOGNITION,
+    HuskyLens.OBJECT_CLASSIFICATION,
+)
+
+class LearnedObject(NamedTuple):
+    """معرف متعلم في خوارزمية"""
+    algorithm: int
+    id: int
+    name: str = ""
+
+class SyncPlan(NamedTuple):
+    """الأوامر اللازمة لخوارزمية واحدة حتى يطابق الجهاز السجل"""
+    algorithm: int
+    forget: bool           # مسح كل معرفات الخوارزمية أولاً
+    learn: List[int]       # معرفات تُتعلم
+    names: Dict[int, str]  # أسماء تُرسل
+
+class ObjectRegistry:
+    """سجل المعرفات المتعلمة وأسمائها مع مزامنة مجمعة مع HUSKYLENS"""
+    
+    def __init__(self, path: str = "learned_objects.json"):
+        self.path = path
+        self.objects: Dict[int, Dict[int, str]] = {}  # الخوارزمية -> {المعرف: الاسم}
+        # آخر حالة مؤكدة لكل جهاز: المنفذ -> الخوارزمية -> {المعرف: الاسم}
+        self.devices: Dict[str, Dict[int, Dict[int, str]]] = {}
+        self.load()
+    
+    def load(self):
+        """تحميل السجل من الملف (سجل فارغ إذا لم يوجد)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            print(f"❌ خطأ في قراءة الملف: {self.path}")
+            return
+        
+        self.objects = {}
+        for entry in data.get("objects", []):
+            self.objects.setdefault(entry["algorithm"], {})[entry["id"]] = entry.get("name", "")
+        self.devices = {
+            device: {int(algorithm): {int(obj_id): name for obj_id, name in ids.items()}
+                     for algorithm, ids in algorithms.items()}
+            for device, algorithms in data.get("devices", {}).items()
+        }
+    
+    def save(self):
+        """حفظ السجل (كتابة ملف مؤقت ثم استبداله حتى لا يتلف عند الانقطاع)"""
+        data = {
+            "objects": [obj._asdict() for obj in self.entries()],
+            "devices": self.devices,
+        }
+        temporary = self.path + ".tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temporary, self.path)
+    
+    def add(self, algorithm: int, object_id: int, name: str = ""):
+        """إضافة معرف أو تغيير اسمه"""
+        self.objects.setdefault(algorithm, {})[object_id] = name
+    
+    def remove(self, algorithm: int, object_id: int):
+        """حذف معرف من السجل (يُنسى من الجهاز عند المزامنة التالية)"""
+        ids = self.objects.get(algorithm, {})
+        ids.pop(object_id, None)
+        if not ids:
+            self.objects.pop(algorithm, None)
+    
+    def entries(self, algorithm: Optional[int] = None) -> List[LearnedObject]:
+        """كل المعرفات المسجلة (أو معرفات خوارزمية واحدة) مرتبة"""
+        algorithms = sorted(self.objects) if algorithm is None else [algorithm]
+        return [LearnedObject(alg, obj_id, name)
+                for alg in algorithms
+                for obj_id, name in sorted(self.objects.get(alg, {}).items())]
+    
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self.objects.values())
+    
+    def read_device(self, husky: HuskyLens, algorithms: Optional[Iterable[int]] = None) -> Dict[int, int]:
+        """عدد المعرفات المتعلمة على الجهاز لكل خوارزمية (كل الاستعلامات في رحلة واحدة)"""
+        algorithms = list(LEARNABLE_ALGORITHMS if algorithms is None else algorithms)
+        original = husky.current_algorithm
+        batch = husky.batch()
+        for algorithm in algorithms:
+            batch.set_algorithm(algorithm).request_info()
+        if original is not None:
+            batch.set_algorithm(original)
+        
+        results = batch.execute()
+        counts = {}
+        for index, algorithm in enumerate(algorithms):
+            switched, info = results[2 * index], results[2 * index + 1]
+            if not switched:
+                raise HuskyLensError(f"فشل تغيير الخوارزمية إلى {algorithm}")
+            counts[algorithm] = info[1]
+        return counts
+    
+    def plan(self, husky: HuskyLens, algorithms: Optional[Iterable[int]] = None) -> List[SyncPlan]:
+        """مقارنة السجل بالجهاز وحساب أقل ما يلزم إرساله"""
+        if algorithms is None:
+            algorithms = set(self.objects) | set(self.devices.get(husky.port, {}))
+        algorithms = sorted(algorithms)
+        if not algorithms:
+            return []
+        counts = self.read_device(husky, algorithms)
+        synced = self.devices.get(husky.port, {})
+        
+        plans = []
+        for algorithm in algorithms:
+            desired = self.objects.get(algorithm, {})
+            known = synced.get(algorithm)
+            # الجهاز لا يعيد قائمة معرفاته بل عددها فقط: نثق بآخر حالة أرسلناها ما دام العدد مطابقاً
+            trusted = known is not None and len(known) == counts[algorithm]
+            
+            if counts[algorithm] == 0:
+                forget, current = False, {}
+            elif trusted and set(known) <= set(desired):
+                forget, current = False, known
+            else:
+                forget, current = True, {}
+            
+            learn = sorted(set(desired) - set(current))
+            names = {obj_id: name for obj_id, name in desired.items()
+                     if name and (obj_id in learn or current.get(obj_id) != name)}
+            if forget or learn or names:
+                plans.append(SyncPlan(algorithm, forget, learn, names))
+        return plans
+    
+    def push(self, husky: HuskyLens, algorithms: Optional[Iterable[int]] = None,
+             on_learn: Optional[Callable[[LearnedObject], None]] = None,
+             bulk: bool = False) -> List[SyncPlan]:
+        """
+        جعل الجهاز مطابقاً للسجل بإرسال الفروق فقط
+        
+        Args:
+            husky: جهاز متصل
+            algorithms: الخوارزميات المطلوب مزامنتها (افتراضياً كل ما في السجل)
+            on_learn: دالة تُستدعى قبل تعلم كل معرف لتضع الكائن أمام الكاميرا (مثلاً بانتظار المستخدم)؛
+                      مطلوبة لأي خطة فيها تعلم، فالجهاز يتعلم ما يراه لحظة وصول الأمر
+            bulk: إرسال كل الأوامر في رحلة تسلسلية واحدة دون on_learn (كل المعرفات تُتعلم
+                  من المشهد نفسه، مفيد فقط عندما يكون المشهد معداً مسبقاً أو للمحاكي)
+        
+        Returns:
+            الخطط التي نُفذت بنجاح
+        """
+        try:
+            plans = self.plan(husky, algorithms)
+        except HuskyLensError as e:
+            print(f"❌ خطأ في قراءة حالة الجهاز: {e}")
+            return []
+        done = []
+        errors = {}  # الخوارزمية -> سبب الفشل
+        
+        if on_learn is None and not bulk:
+            for plan in plans:
+                if plan.learn:
+                    errors[plan.algorithm] = "التعلم يحتاج on_learn لعرض كل كائن أمام الكاميرا (أو bulk=True)"
+        
+        if on_learn is None:
+            queued = [plan for plan in plans if plan.algorithm not in errors]
+            batch = husky.batch()
+            for plan in queued:
+                self._queue_prepare(batch, plan)
+                for obj_id in plan.learn:
+                    batch.learn(obj_id)
+                self._queue_names(batch, plan)
+            try:
+                results = batch.execute() if queued else []
+            except HuskyLensError as e:
+                results = []
+                for plan in queued:
+                    errors[plan.algorithm] = str(e)
+            
+            offset = 0
+            for plan in queued:
+                size = 1 + plan.forget + len(plan.learn) + len(plan.names)
+                if results and all(results[offset:offset + size]):
+                    done.append(plan)
+                offset += size
+        else:
+            for plan in plans:
+                try:
+                    if not all(self._queue_prepare(husky.batch(), plan).execute()):
+                        continue
+                    learned = True
+                    for obj_id in plan.learn:
+                        on_learn(LearnedObject(plan.algorithm, obj_id, self.objects[plan.algorithm][obj_id]))
+                        learned = husky.batch().learn(obj_id).execute()[0] and learned
+                    if learned and all(self._queue_names(husky.batch(), plan).execute()):
+                        done.append(plan)
+                except HuskyLensError as e:
+                    errors[plan.algorithm] = str(e)
+        
+        for plan in plans:
+            if plan in done:
+                self._mark_synced(husky.port, plan)
+            else:
+                reason = errors.get(plan.algorithm, "لم يؤكد الجهاز كل الأوامر")
+                print(f"❌ فشلت مزامنة {HuskyLens.ALGORITHM_NAMES.get(plan.algorithm, plan.algorithm)}: {reason}")
+        self.save()
+        
+        learned = sum(len(plan.learn) for plan in done)
+        named = sum(len(plan.names) for plan in done)
+        print(f"🧠 تمت المزامنة: {learned} معرف متعلم، {named} اسم")
+        return done
+    
+    @staticmethod
+    def _queue_prepare(batch, plan: SyncPlan):
+        """اختيار خوارزمية الخطة ومسح معرفاتها عند الحاجة"""
+        batch.set_algorithm(plan.algorithm)
+        if plan.forget:
+            batch.forget()
+        return batch
+    
+    @staticmethod
+    def _queue_names(batch, plan: SyncPlan):
+        """إرسال أسماء الخطة (بعد تعلم معرفاتها)"""
+        for obj_id, name in plan.names.items():
+            batch.set_custom_name(obj_id, name)
+        return batch
+    
+    def _mark_synced(self, device: str, plan: SyncPlan):
+        """تسجيل حالة الجهاز بعد تنفيذ خطة بنجاح"""
+        self.devices.setdefault(device, {})[plan.algorithm] = dict(self.objects.get(plan.algorithm, {}))
+    
+    def pull(self, husky: HuskyLens, algorithms: Optional[Iterable[int]] = None) -> Dict[int, int]:
+        """
+        استيراد المعرفات المتعلمة على الجهاز إلى السجل
+        
+        الجهاز يعيد عدد المعرفات فقط ويرقمها تسلسلياً عند التعلم من أزراره، فتُضاف
+        المعرفات 1..العدد الناقصة بلا أسماء.
+        """
+        counts = self.read_device(husky, algorithms)
+        synced = self.devices.setdefault(husky.port, {})
+        for algorithm, count in counts.items():
+            known = synced.get(algorithm)
+            if count == 0:
+                synced.pop(algorithm, None)
+                continue
+            if known is not None and len(known) == count:
+                continue
+            ids = self.objects.setdefault(algorithm, {})
+            for obj_id in range(1, count + 1):
+                ids.setdefault(obj_id, "")
+            synced[algorithm] = {obj_id: ids[obj_id] for obj_id in range(1, count + 1)}
+        self.save()
+        return counts
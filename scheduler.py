@@ -0,0 +1,149 @@
+"""
+مجدول حلقات تحكم بمعدل ثابت
+Fixed-rate real-time loop scheduler
+
+يشغل كل مرحلة بمواعيد نهائية ثابتة محسوبة من time.monotonic بدلاً من
+النوم لمدة ثابتة بعد العمل، فلا ينجرف الدور مع زمن الإدخال/الإخراج،
+ويسجل التجاوزات والارتعاش (jitter) لكل حلقة.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+class LoopStats:
+    """إحصائيات حلقة: عدد الدورات، التجاوزات، الأخطاء، والارتعاش"""
+    
+    def __init__(self, window: int = 500):
+        self.jitter = deque(maxlen=window)    # تأخر بداية الدورة عن موعدها (ثوانٍ)
+        self.durations = deque(maxlen=window)  # زمن تنفيذ الدورة (ثوانٍ)
+        self.reset()
+    
+    def reset(self):
+        """تصفير العدادات في نفس الكائن حتى يبقى مرجع القارئ الحي صالحاً"""
+        self.iterations = 0
+        self.overruns = 0
+        self.skipped = 0  # مواعيد فائتة بسبب تجاوز طويل
+        self.errors = 0
+        self.jitter.clear()
+        self.durations.clear()
+        self.started = time.monotonic()
+    
+    def summary(self) -> dict:
+        """ملخص بالمللي ثانية"""
+        elapsed = time.monotonic() - self.started
+        jitter = sorted(self.jitter)
+        durations = list(self.durations)
+        return {
+            "iterations": self.iterations,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "rate_hz": self.iterations / elapsed if elapsed > 0 else 0.0,
+            "jitter_mean_ms": sum(jitter) / len(jitter) * 1000 if jitter else 0.0,
+            "jitter_p95_ms": jitter[int(len(jitter) * 0.95)] * 1000 if jitter else 0.0,
+            "jitter_max_ms": jitter[-1] * 1000 if jitter else 0.0,
+            "duration_mean_ms": sum(durations) / len(durations) * 1000 if durations else 0.0,
+        }
+
+class FixedRateLoop:
+    """تشغيل دالة بمعدل ثابت وفق مواعيد نهائية أحادية الاتجاه (monotonic)"""
+    
+    def __init__(self, rate_hz: float, step: Callable[[], Any], name: str = "loop",
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        """
+        Args:
+            rate_hz: المعدل المطلوب (دورة/ثانية)
+            step: الدالة المنفذة في كل دورة
+            name: اسم الحلقة (للخيط والسجلات)
+            on_error: دالة تُستدعى عند استثناء في step (الحلقة تستمر دون توقف إضافي)
+        """
+        self.period = 1.0 / rate_hz
+        self.step = step
+        self.name = name
+        self.on_error = on_error
+        self.stats = LoopStats()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+    
+    def run(self, should_continue: Callable[[], bool] = lambda: True):
+        """تشغيل الحلقة في الخيط الحالي حتى الإيقاف"""
+        self._running = True
+        self._loop(should_continue)
+    
+    def _loop(self, should_continue: Callable[[], bool]):
+        """جسم الحلقة؛ لا يرفع علم التشغيل حتى لا يضيع stop() سبق بدء الخيط"""
+        self.stats.reset()
+        deadline = time.monotonic()
+        
+        while self._running and should_continue():
+            started = time.monotonic()
+            self.stats.jitter.append(max(0.0, started - deadline))
+            try:
+                self.step()
+            except Exception as e:
+                self.stats.errors += 1
+                if self.on_error is not None:
+                    self.on_error(e)
+            finished = time.monotonic()
+            self.stats.durations.append(finished - started)
+            self.stats.iterations += 1
+            
+            deadline += self.period
+            if finished > deadline:
+                # تجاوز: نقفز إلى الموعد التالي في المستقبل بدلاً من محاولة اللحاق
+                self.stats.overruns += 1
+                missed = int((finished - deadline) / self.period) + 1
+                self.stats.skipped += missed - 1
+                deadline += missed * self.period
+            
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        
+        self._running = False
+    
+    def start(self, should_continue: Callable[[], bool] = lambda: True):
+        """تشغيل الحلقة في خيط خلفي"""
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, args=(should_continue,),
+                                        name=self.name, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """إيقاف الحلقة وانتظار خيطها إن وجد"""
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+            self._thread = None
+
+class LatestQueue:
+    """طابور محدود لا يحجب الكاتب: عند الامتلاء يُسقط أقدم عنصر"""
+    
+    def __init__(self, maxsize: int = 1):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+    
+    def put(self, item: Any):
+        """إضافة عنصر دون انتظار أبداً"""
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+    
+    def get_latest(self) -> Optional[Any]:
+        """أحدث عنصر مع تفريغ الباقي (None إذا كان الطابور فارغاً)"""
+        item = None
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return item
@@ -0,0 +1,304 @@
+"""
+محاكي برمجي لـ HUSKYLENS
+Synthetic HUSKYLENS device simulator
+
+يتحدث نفس البروتوكول التسلسلي ويولد مشاهد قابلة للضبط (كتل متحركة،
+وجوه بمعرفات، خطوط كأسهم، رموز QR) بمعدل إطارات محدد مع ضجيج وإطارات
+مفقودة أو تالفة، لاختبار المكتبة تحت الحمل دون أجهزة حقيقية.
+
+طرق الاستخدام:
+- SimulatedTransport: داخل نفس العملية عبر HuskyLens(transport=...)
+- serve_pty: طرفية وهمية (Linux/macOS) يتصل بها HuskyLens(port=path)
+- serve_tcp: مقبس TCP يتصل به HuskyLens(port='socket://host:port')
+"""
+
+import os
+import socket
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from huskylens import HuskyLens, build_packet, iter_frames
+from transport import Transport
+
+class SimulatedScene:
+    """مشهد متحرك يولد كتلاً وأسهماً بمعدل إطارات ثابت"""
+    
+    # أحجام الكائنات لكل نوع مشهد: (أدنى، أقصى) بالبكسل
+    KINDS = {
+        "blocks": (10, 60),
+        "faces": (40, 90),
+        "qr": (30, 50),
+        "lines": (0, 0),
+    }
+    
+    def __init__(self, kind: str = "blocks", num_objects: int = 5, num_arrows: int = 0,
+                 fps: float = 30.0, noise: float = 0.0, speed: float = 60.0,
+                 frame_size: Tuple[int, int] = (320, 240), seed: Optional[int] = None):
+        """
+        Args:
+            kind: نوع المشهد: blocks أو faces أو qr أو lines
+            num_objects: عدد الكائنات (المستطيلات)
+            num_arrows: عدد الأسهم (الخطوط)، وفي مشهد lines الافتراضي سهم واحد
+            fps: معدل تحديث المشهد
+            noise: الانحراف المعياري لضجيج المواقع (بكسل)
+            speed: أقصى سرعة للكائنات (بكسل/ثانية)
+            frame_size: أبعاد إطار العدسة
+            seed: بذرة المولد العشوائي لنتائج قابلة للتكرار
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"نوع مشهد غير معروف: {kind}")
+        self.kind = kind
+        self.fps = fps
+        self.noise = noise
+        self.frame_size = np.array(frame_size, dtype=np.float64)
+        self.rng = np.random.default_rng(seed)
+        
+        if kind == "lines":
+            num_objects, num_arrows = 0, num_arrows or 1
+        low, high = self.KINDS[kind]
+        self.sizes = self.rng.uniform(low, high, (num_objects, 2)) if num_objects else np.zeros((0, 2))
+        self.positions = self.rng.uniform(0, 1, (num_objects, 2)) * self.frame_size
+        self.velocities = self.rng.uniform(-speed, speed, (num_objects, 2))
+        # الوجوه ورموز QR لها معرفات متعلمة ثابتة، والكتل العامة بدون معرف
+        if kind in ("faces", "qr"):
+            self.ids = np.arange(1, num_objects + 1)
+        else:
+            self.ids = np.zeros(num_objects, dtype=np.int64)
+        
+        self.arrow_phase = self.rng.uniform(0, 2 * np.pi, num_arrows)
+        self.frame_number = 0
+        self._start = time.monotonic()
+    
+    def step(self, now: Optional[float] = None):
+        """تقديم المشهد إلى الإطار المناسب للحظة الحالية"""
+        now = time.monotonic() if now is None else now
+        target = int((now - self._start) * self.fps)
+        frames = target - self.frame_number
+        if frames <= 0:
+            return
+        dt = frames / self.fps
+        self.frame_number = target
+        
+        # حركة خطية مع ارتداد عن حواف الإطار
+        self.positions += self.velocities * dt
+        for axis in range(2):
+            limit = self.frame_size[axis]
+            low = self.positions[:, axis] < 0
+            high = self.positions[:, axis] > limit
+            self.positions[low, axis] *= -1
+            self.positions[high, axis] = 2 * limit - self.positions[high, axis]
+            self.velocities[low | high, axis] *= -1
+        self.positions = np.clip(self.positions, 0, self.frame_size)
+        self.arrow_phase += dt
+    
+    def blocks(self) -> np.ndarray:
+        """الكتل الحالية (N, 5): مركز x، مركز y، العرض، الارتفاع، المعرف"""
+        positions = self.positions
+        if self.noise > 0 and len(positions):
+            positions = positions + self.rng.normal(0, self.noise, positions.shape)
+        positions = np.clip(positions, 0, self.frame_size)
+        return np.column_stack((positions, self.sizes, self.ids)).astype(np.int64)
+    
+    def arrows(self) -> np.ndarray:
+        """الأسهم الحالية (N, 5): ذيل x، ذيل y، رأس x، رأس y، المعرف"""
+        width, height = self.frame_size
+        offsets = np.sin(self.arrow_phase) * width / 4
+        count = len(offsets)
+        lanes = (np.arange(count) + 1) * width / (count + 1)
+        tail_x = lanes
+        head_x = lanes + offsets
+        result = np.column_stack((tail_x, np.full(count, height), head_x, np.zeros(count),
+                                  np.arange(1, count + 1)))
+        return np.clip(result, 0, None).astype(np.int64)
+
+def encode_objects(command: int, objects: np.ndarray) -> bytes:
+    """ترميز كل الكائنات كإطارات بروتوكول دفعة واحدة مع المجموع الاختباري"""
+    count = len(objects)
+    if not count:
+        return b''
+    rows = np.zeros((count, 16), dtype=np.uint8)
+    rows[:, :3] = np.frombuffer(HuskyLens.FRAME_HEADER, dtype=np.uint8)
+    rows[:, 3] = 10
+    rows[:, 4] = command
+    rows[:, 5:15] = np.ascontiguousarray(objects.astype('<u2')).view(np.uint8).reshape(count, 10)
+    rows[:, 15] = rows[:, :15].sum(axis=1) & 0xFF
+    return rows.tobytes()
+
+class HuskyLensSimulator:
+    """جهاز HUSKYLENS وهمي: يستقبل حزم الأوامر ويرجع الردود"""
+    
+    def __init__(self, scene: Optional[SimulatedScene] = None, drop_rate: float = 0.0,
+                 corrupt_rate: float = 0.0, seed: Optional[int] = None):
+        """
+        Args:
+            scene: المشهد المولد (افتراضياً 5 كتل متحركة)
+            drop_rate: احتمال عدم الرد على طلب كشف (يسبب انتهاء مهلة لدى العميل)
+            corrupt_rate: احتمال إفساد بايت في أحد إطارات الكائنات لرد طلب كشف (خطأ مجموع اختباري
+                          يتجاوزه المحلل)؛ إطار المعلومات لا يُفسد لأن العميل يرفض الرد كله عندها
+            seed: بذرة المولد العشوائي
+        """
+        self.scene = scene or SimulatedScene(seed=seed)
+        self.drop_rate = drop_rate
+        self.corrupt_rate = corrupt_rate
+        self.rng = np.random.default_rng(seed)
+        self.algorithm = HuskyLens.FACE_RECOGNITION
+        self.learned = {}  # الخوارزمية -> {المعرف: الاسم}
+        self.requests = 0
+    
+    def handle(self, data: bytes) -> bytes:
+        """معالجة بايتات واردة (حزمة أو أكثر) وإرجاع بايتات الرد"""
+        response = bytearray()
+        for command, payload in iter_frames(data):
+            self.requests += 1
+            response += self._handle_command(command, bytes(payload))
+        return bytes(response)
+    
+    def _handle_command(self, command: int, payload: bytes) -> bytes:
+        """رد أمر واحد"""
+        if command == HuskyLens.COMMAND_ALGORITHM and payload:
+            self.algorithm = payload[0]
+        elif command == HuskyLens.COMMAND_REQUEST_LEARN and len(payload) >= 2:
+            self.learned.setdefault(self.algorithm, {}).setdefault(payload[0] | (payload[1] << 8), "")
+        elif command == HuskyLens.COMMAND_REQUEST_FORGET:
+            self.learned.pop(self.algorithm, None)
+        elif command == HuskyLens.COMMAND_REQUEST_CUSTOMNAMES and len(payload) >= 2:
+            names = self.learned.get(self.algorithm, {})
+            if payload[0] in names:
+                names[payload[0]] = payload[2:1 + payload[1]].decode('utf-8', 'replace')
+        if command not in (HuskyLens.COMMAND_REQUEST, HuskyLens.COMMAND_REQUEST_BLOCKS,
+                           HuskyLens.COMMAND_REQUEST_ARROWS):
+            return build_packet(HuskyLens.COMMAND_RETURN_OK)
+        
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            return b''
+        
+        self.scene.step()
+        blocks = self.scene.blocks() if command != HuskyLens.COMMAND_REQUEST_ARROWS else np.zeros((0, 5))
+        arrows = self.scene.arrows() if command != HuskyLens.COMMAND_REQUEST_BLOCKS else np.zeros((0, 5))
+        
+        count = len(blocks) + len(arrows)
+        learned = len(self.learned.get(self.algorithm, ()))
+        info = np.array([count, learned, self.scene.frame_number & 0xFFFF, 0, 0], dtype='<u2')
+        response = bytearray(build_packet(HuskyLens.COMMAND_RETURN_INFO, info.tobytes()))
+        response += encode_objects(HuskyLens.COMMAND_RETURN_BLOCK, blocks)
+        response += encode_objects(HuskyLens.COMMAND_RETURN_ARROW, arrows)
+        
+        if self.corrupt_rate and count and self.rng.random() < self.corrupt_rate:
+            # إفساد بايت بيانات (ليس في الترويسة) في إطار كائن ليكشفه المجموع الاختباري
+            frame = int(self.rng.integers(1, len(response) // 16))
+            response[frame * 16 + 5 + int(self.rng.integers(0, 10))] ^= 0xFF
+        return bytes(response)
+
+class SimulatedTransport(Transport):
+    """ناقل داخل العملية يوصل HuskyLens بالمحاكي مباشرة"""
+    
+    def __init__(self, simulator: Optional[HuskyLensSimulator] = None):
+        self.simulator = simulator or HuskyLensSimulator()
+        self.timeout = 1.0
+        self.baudrate = 9600
+        self._open = False
+        self._buffer = bytearray()
+    
+    def open(self):
+        self._open = True
+    
+    def close(self):
+        self._open = False
+    
+    @property
+    def is_open(self) -> bool:
+        return self._open
+    
+    def write(self, data: bytes) -> int:
+        self._buffer += self.simulator.handle(data)
+        return len(data)
+    
+    def read(self, size: int) -> bytes:
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+    
+    def reset_input_buffer(self):
+        self._buffer.clear()
+
+def _serve_stream(simulator: HuskyLensSimulator, read, write, stop: threading.Event):
+    """حلقة خدمة عامة: تجميع البايتات حتى اكتمال الحزم ثم الرد"""
+    buffer = bytearray()
+    while not stop.is_set():
+        try:
+            chunk = read()
+        except OSError:
+            break
+        if not chunk:
+            break
+        buffer += chunk
+        
+        # معالجة كل الحزم المكتملة وترك الجزء الناقص للقراءة التالية
+        end = 0
+        start = buffer.find(HuskyLens.FRAME_HEADER)
+        while 0 <= start and start + 5 <= len(buffer):
+            frame_end = start + 5 + buffer[start + 3] + 1
+            if frame_end > len(buffer):
+                break
+            end = frame_end
+            start = buffer.find(HuskyLens.FRAME_HEADER, frame_end)
+        if end:
+            response = simulator.handle(bytes(buffer[:end]))
+            del buffer[:end]
+            if response:
+                write(response)
+
+def serve_pty(simulator: Optional[HuskyLensSimulator] = None) -> Tuple[str, threading.Event]:
+    """
+    تشغيل المحاكي على طرفية وهمية (pty)
+    
+    Returns:
+        (مسار المنفذ لاستخدامه في HuskyLens(port=...)، حدث الإيقاف)
+    """
+    import tty
+    
+    simulator = simulator or HuskyLensSimulator()
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    stop = threading.Event()
+    
+    def write(data: bytes):
+        os.write(master, data)
+    
+    thread = threading.Thread(target=_serve_stream, daemon=True, name="huskylens-sim-pty",
+                              args=(simulator, lambda: os.read(master, 4096), write, stop))
+    thread.start()
+    return os.ttyname(slave), stop
+
+def serve_tcp(simulator: Optional[HuskyLensSimulator] = None, host: str = "127.0.0.1",
+              port: int = 0) -> Tuple[int, threading.Event]:
+    """
+    تشغيل المحاكي على مقبس TCP (عميل واحد في كل مرة)
+    
+    Returns:
+        (رقم المنفذ الفعلي، حدث الإيقاف)؛ العنوان للاتصال: socket://host:port
+    """
+    simulator = simulator or HuskyLensSimulator()
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen(1)
+    server.settimeout(0.5)
+    stop = threading.Event()
+    
+    def accept_loop():
+        while not stop.is_set():
+            try:
+                client, _ = server.accept()
+            except socket.timeout:
+                continue
+            with client:
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                _serve_stream(simulator, lambda: client.recv(4096), client.sendall, stop)
+        server.close()
+    
+    threading.Thread(target=accept_loop, daemon=True, name="huskylens-sim-tcp").start()
+    return server.getsockname()[1], stop
@@ -5,16 +5,34 @@ Smart Robot using HUSKYLENS
 مثال لروبوت يتبع الوجوه والكائنات
 """
 
+from control import STOP, MotionCommand, TrackingController
 from huskylens import HuskyLens, HuskyLensObject
+from metrics import METRICS
+from scheduler import FixedRateLoop, LatestQueue
+from utils import ObjectTracker
 import time
 import threading
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 class SmartRobot:
     """روبوت ذكي مع HUSKYLENS"""
     
-    def __init__(self, huskylens_port: str = 'COM3'):
-        self.husky = HuskyLens(huskylens_port)
+    def __init__(self, huskylens_port: str = 'COM3', streaming: bool = False,
+                 predict_motion: bool = False, transport=None,
+                 controller: Optional[TrackingController] = None):
+        # transport: ناقل بديل (مثل ReplayTransport) لتشغيل الروبوت دون جهاز
+        self.husky = HuskyLens(huskylens_port, transport=transport)
+        self.streaming = streaming  # قراءة الكائنات من خيط خلفي بدلاً من الطلب المباشر
+        # التوجه نحو الموقع المتوقع للهدف الآن بدلاً من موقعه وقت الالتقاط
+        self.tracker = ObjectTracker(kalman=True) if predict_motion else None
+        self.tracked_frame = {}
+        self._tracked_sequence = None  # رقم آخر إطار متدفق مرره المتتبع
+        # متحكم PID يحول موقع الهدف إلى سرعات مستمرة
+        self.controller = controller or TrackingController()
+        self._tracker_lock = threading.Lock()  # الإدراك والتحكم قد يعملان في خيطين
+        self.loop_stats = {}  # اسم الحلقة -> LoopStats لآخر تشغيل
+        self.no_target_count = 0
+        self.max_no_target = 10  # عدد المحاولات قبل التوقف
         self.is_running = False
         self.current_target: Optional[HuskyLensObject] = None
         self.mode = "idle"  # idle, face_tracking, object_tracking, color_tracking
@@ -23,6 +41,9 @@ class SmartRobot:
         """بدء تشغيل الروبوت"""
         if self.husky.connect():
             self.is_running = True
+            if self.streaming:
+                self._tracked_sequence = None
+                self.husky.start_streaming()
             print("🤖 الروبوت الذكي جاهز للعمل!")
             return True
         else:
@@ -65,8 +86,31 @@ class SmartRobot:
         if not self.is_running:
             return []
         
-        return self.husky.get_blocks()
+        fresh = True
+        if self.husky.is_streaming:
+            # أحدث إطار جاهز في الذاكرة دون انتظار المنفذ التسلسلي
+            frame = self.husky.get_latest_frame()
+            detections = frame.blocks if frame else []
+            timestamp = frame.timestamp if frame else time.monotonic()
+            # حلقة أسرع من الجهاز تقرأ الإطار نفسه مجدداً: تمريره للمتتبع يكرر القياس نفسه بـ dt=0
+            sequence = frame.sequence if frame else None
+            fresh = sequence is not None and sequence != self._tracked_sequence
+            if fresh:
+                self._tracked_sequence = sequence
+        else:
+            detections = self.husky.get_blocks()
+            timestamp = time.monotonic()
+        
+        if self.tracker is not None and fresh:
+            # نصف زمن الرحلة تقدير لتأخر لحظة الالتقاط عن لحظة الوصول
+            boxes = [(obj.x, obj.y, obj.width, obj.height) for obj in detections]
+            with self._tracker_lock:
+                self.tracker.latency = self.husky.last_latency / 2
+                self.tracked_frame = self.tracker.update(boxes, timestamp)
+        
+        return detections
     
+    @METRICS.timed("robot.find_best_target")
     def find_best_target(self, detections: List[HuskyLensObject]) -> Optional[HuskyLensObject]:
         """العثور على أفضل هدف للتتبع"""
         if not detections:
@@ -76,148 +120,125 @@ class SmartRobot:
         best_target = max(detections, key=lambda obj: obj.width * obj.height)
         return best_target
     
-    def calculate_movement_direction(self, target: HuskyLensObject) -> str:
-        """حساب اتجاه الحركة المطلوب"""
-        center_x = target.center_x
-        center_y = target.center_y
-        
-        # افتراض أن عرض الشاشة 320 وارتفاعها 240
-        screen_width = 320
-        screen_height = 240
-        
-        # مناطق التحكم
-        left_zone = screen_width // 3
-        right_zone = 2 * screen_width // 3
-        top_zone = screen_height // 3
-        bottom_zone = 2 * screen_height // 3
-        
-        movements = []
-        
-        # الاتجاه الأفقي
-        if center_x < left_zone:
-            movements.append("يسار")
-        elif center_x > right_zone:
-            movements.append("يمين")
-        else:
-            movements.append("توقف_أفقي")
-        
-        # الاتجاه العمودي (للكاميرا المتحركة)
-        if center_y < top_zone:
-            movements.append("أعلى")
-        elif center_y > bottom_zone:
-            movements.append("أسفل")
-        else:
-            movements.append("توقف_عمودي")
-        
-        # تحديد قرب/بعد الكائن بناءً على الحجم
-        object_size = target.width * target.height
-        if object_size < 2000:  # كائن صغير = بعيد
-            movements.append("تقدم")
-        elif object_size > 8000:  # كائن كبير = قريب
-            movements.append("تراجع")
-        else:
-            movements.append("توقف_عمق")
-        
-        return " + ".join(movements)
+    def predict_target_center(self, target: HuskyLensObject) -> Tuple[float, float]:
+        """موقع الهدف المتوقع الآن (أو موقعه المقاس إذا كان التنبؤ معطلاً)"""
+        if self.tracker is not None:
+            box = (target.x, target.y, target.width, target.height)
+            with self._tracker_lock:
+                for obj_id, tracked_box in self.tracked_frame.items():
+                    if tracked_box == box:
+                        predicted = self.tracker.predict_position(obj_id)
+                        if predicted is not None:
+                            return predicted
+        return (target.center_x, target.center_y)
     
-    def execute_movement(self, direction: str):
+    @METRICS.timed("robot.calculate_motion_command")
+    def calculate_motion_command(self, target: HuskyLensObject) -> MotionCommand:
+        """حساب أمر الحركة (سرعات الدوران والإمالة والتقدم)"""
+        center_x, center_y = self.predict_target_center(target)
+        return self.controller.update(center_x, center_y, target.width * target.height)
+    
+    @METRICS.timed("robot.execute_movement")
+    def execute_movement(self, command: MotionCommand):
         """تنفيذ الحركة (محاكاة - يمكن ربطها بمحركات حقيقية)"""
-        print(f"🚀 تنفيذ الحركة: {direction}")
+        print(f"🚀 تنفيذ الحركة: {command}")
         
         # هنا يمكن إضافة كود التحكم الفعلي في المحركات
         # مثل Arduino, Raspberry Pi, إلخ
         
-        if "يسار" in direction:
-            self.move_left()
-        if "يمين" in direction:
-            self.move_right()
-        if "تقدم" in direction:
-            self.move_forward()
-        if "تراجع" in direction:
-            self.move_backward()
-        if "أعلى" in direction:
-            self.camera_up()
-        if "أسفل" in direction:
-            self.camera_down()
-    
-    def move_left(self):
-        """حركة يسار"""
-        print("⬅️ تحرك يساراً")
-        # كود التحكم في المحرك الأيسر هنا
+        self.drive(command.forward, command.pan)
+        self.move_camera(command.tilt)
     
-    def move_right(self):
-        """حركة يمين"""
-        print("➡️ تحرك يميناً")
-        # كود التحكم في المحرك الأيمن هنا
+    def drive(self, forward: float, turn: float):
+        """سرعة العجلات: forward للأمام/الخلف و turn للدوران (كلاهما -1..1)"""
+        # سرعتا المحركين الأيسر والأيمن لقاعدة تفاضلية
+        left = max(-1.0, min(1.0, forward + turn))
+        right = max(-1.0, min(1.0, forward - turn))
+        print(f"⚙️ المحركات: يسار={left:+.2f}, يمين={right:+.2f}")
+        # كود التحكم في المحركات هنا (PWM مثلاً)
     
-    def move_forward(self):
-        """حركة للأمام"""
-        print("⬆️ تحرك للأمام")
-        # كود التحكم في المحركات للأمام هنا
+    def move_camera(self, tilt: float):
+        """سرعة إمالة الكاميرا (-1..1، موجب للأسفل)"""
+        print(f"📹 إمالة الكاميرا: {tilt:+.2f}")
+        # كود التحكم في محرك الكاميرا هنا
     
-    def move_backward(self):
-        """حركة للخلف"""
-        print("⬇️ تحرك للخلف")
-        # كود التحكم في المحركات للخلف هنا
+    def _act_on_target(self, target: Optional[HuskyLensObject]):
+        """تنفيذ الحركة نحو الهدف أو منطق البحث عند غيابه"""
+        if target is not None:
+            # إعادة تعيين العداد
+            self.no_target_count = 0
+            self.current_target = target
+            
+            # حساب أمر الحركة وتنفيذه
+            self.execute_movement(self.calculate_motion_command(target))
+            
+            # عرض معلومات الهدف
+            print(f"🎯 الهدف: موقع({target.center_x}, {target.center_y}), حجم: {target.width}x{target.height}")
+        
+        else:
+            # لا يوجد هدف
+            self.no_target_count += 1
+            self.current_target = None
+            self.controller.reset()
+            
+            if self.no_target_count <= self.max_no_target:
+                print(f"🔍 البحث عن هدف... ({self.no_target_count}/{self.max_no_target})")
+                # دوران بحث
+                self.search_rotation()
+            else:
+                print("😴 توقف - لا يوجد هدف")
+                self.stop_all_movement()
     
-    def camera_up(self):
-        """توجيه الكاميرا للأعلى"""
-        print("📹⬆️ توجيه الكاميرا للأعلى")
-        # كود التحكم في محرك الكاميرا هنا
+    def _on_loop_error(self, error: Exception):
+        """طباعة خطأ الحلقة دون إيقافها أو تأخيرها"""
+        print(f"❌ خطأ في حلقة التتبع: {error}")
     
-    def camera_down(self):
-        """توجيه الكاميرا للأسفل"""
-        print("📹⬇️ توجيه الكاميرا للأسفل")
-        # كود التحكم في محرك الكاميرا هنا
+    def run_tracking_loop(self, rate_hz: float = 10.0):
+        """حلقة التتبع الرئيسية بمعدل ثابت (الكشف ثم الحركة في نفس الدورة)"""
+        self.no_target_count = 0
+        
+        def step():
+            # الحصول على الكائنات المكتشفة ثم العثور على أفضل هدف
+            detections = self.get_detections()
+            self._act_on_target(self.find_best_target(detections))
+        
+        loop = FixedRateLoop(rate_hz, step, "tracking", on_error=self._on_loop_error)
+        self.loop_stats = {"tracking": loop.stats}
+        loop.run(lambda: self.is_running)
     
-    def run_tracking_loop(self):
-        """حلقة التتبع الرئيسية"""
-        print(f"🔄 بدء حلقة التتبع في وضع: {self.mode}")
+    def run_pipelined_loop(self, perception_hz: float = 30.0, control_hz: float = 50.0):
+        """
+        حلقة تتبع بمرحلتين منفصلتين بمعدلين ثابتين
         
-        no_target_count = 0
-        max_no_target = 10  # عدد المحاولات قبل التوقف
+        مرحلة الإدراك (خيط خلفي) تقرأ الكشوفات وتختار الهدف وتضعه في طابور محدود،
+        ومرحلة التحكم (هذا الخيط) تأخذ أحدث هدف وتحدّث المحركات في كل دورة،
+        فلا تؤخر قراءة تسلسلية بطيئة تحديث المحركات.
+        """
+        self.no_target_count = 0
+        targets = LatestQueue(maxsize=1)
         
-        while self.is_running:
-            try:
-                # الحصول على الكائنات المكتشفة
-                detections = self.get_detections()
-                
-                if detections:
-                    # إعادة تعيين العداد
-                    no_target_count = 0
-                    
-                    # العثور على أفضل هدف
-                    target = self.find_best_target(detections)
-                    self.current_target = target
-                    
-                    # حساب الاتجاه المطلوب
-                    direction = self.calculate_movement_direction(target)
-                    
-                    # تنفيذ الحركة
-                    self.execute_movement(direction)
-                    
-                    # عرض معلومات الهدف
-                    print(f"🎯 الهدف: موقع({target.center_x}, {target.center_y}), حجم: {target.width}x{target.height}")
-                
-                else:
-                    # لا يوجد هدف
-                    no_target_count += 1
-                    self.current_target = None
-                    
-                    if no_target_count <= max_no_target:
-                        print(f"🔍 البحث عن هدف... ({no_target_count}/{max_no_target})")
-                        # دوران بحث
-                        self.search_rotation()
-                    else:
-                        print("😴 توقف - لا يوجد هدف")
-                        self.stop_all_movement()
-                
-                # انتظار قبل القراءة التالية
-                time.sleep(0.1)  # 10 FPS
-                
-            except Exception as e:
-                print(f"❌ خطأ في حلقة التتبع: {e}")
-                time.sleep(1)
+        def perceive():
+            detections = self.get_detections()
+            # نغلف الهدف لنفرق بين "لا هدف" و"لا إطار جديد"
+            targets.put((self.find_best_target(detections),))
+        
+        def control():
+            fresh = targets.get_latest()
+            if fresh is not None:
+                self._act_on_target(fresh[0])
+            elif self.tracker is not None and self.current_target is not None:
+                # مع التنبؤ نعيد توجيه المحركات في كل دورة نحو الموقع المتوقع الآن
+                self._act_on_target(self.current_target)
+        
+        perception = FixedRateLoop(perception_hz, perceive, "perception", on_error=self._on_loop_error)
+        actuation = FixedRateLoop(control_hz, control, "control", on_error=self._on_loop_error)
+        self.loop_stats = {"perception": perception.stats, "control": actuation.stats}
+        
+        perception.start(lambda: self.is_running)
+        try:
+            actuation.run(lambda: self.is_running)
+        finally:
+            perception.stop()
     
     def search_rotation(self):
         """دوران بحث عن الهدف"""
@@ -227,7 +248,8 @@ class SmartRobot:
     def stop_all_movement(self):
         """إيقاف جميع الحركات"""
         print("🛑 إيقاف جميع الحركات")
-        # كود إيقاف المحركات
+        self.drive(STOP.forward, STOP.pan)
+        self.move_camera(STOP.tilt)
 
 def interactive_robot_demo():
     """عرض تفاعلي للروبوت الذكي"""
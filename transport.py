@@ -0,0 +1,287 @@
+"""
+نواقل الاتصال مع HUSKYLENS
+Transports for HUSKYLENS
+
+- SerialTransport: منفذ تسلسلي حقيقي عبر pyserial
+- RecordingTransport: يغلف ناقلاً آخر ويسجل كل البايتات مع توقيتها
+- ReplayTransport: يعيد تشغيل جلسة مسجلة بالسرعة الحقيقية أو بأقصى سرعة
+
+كل النواقل تقدم نفس الواجهة التي يستخدمها HuskyLens من serial.Serial،
+فيمكن تشغيل get_blocks وحلقات التحكم واختبارات الأداء دون جهاز.
+"""
+
+import bisect
+import itertools
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+try:
+    import serial
+except ImportError:  # غير مطلوب لإعادة تشغيل الجلسات المسجلة
+    serial = None
+
+class Transport(ABC):
+    """الواجهة المشتركة لكل النواقل (ناقل ينقصه أحد الأساليب يفشل عند إنشائه)"""
+    
+    timeout: float = 1.0
+    baudrate: int = 9600
+    
+    @abstractmethod
+    def open(self):
+        """فتح الناقل"""
+    
+    @abstractmethod
+    def close(self):
+        """إغلاق الناقل"""
+    
+    @property
+    @abstractmethod
+    def is_open(self) -> bool:
+        """هل الناقل مفتوح"""
+    
+    @abstractmethod
+    def write(self, data: bytes) -> int:
+        """كتابة بايتات"""
+    
+    @abstractmethod
+    def read(self, size: int) -> bytes:
+        """قراءة حتى size بايت (أقل عند انتهاء المهلة)"""
+    
+    @abstractmethod
+    def reset_input_buffer(self):
+        """تجاهل البايتات المنتظرة في مخزن الإدخال"""
+
+class SerialTransport(Transport):
+    """منفذ تسلسلي حقيقي"""
+    
+    def __init__(self, port: str, baudrate: int = 9600, timeout: float = 1.0):
+        self.port = port
+        self._baudrate = baudrate
+        self._timeout = timeout
+        self._serial = None
+    
+    def open(self):
+        if serial is None:
+            raise ImportError("مكتبة pyserial غير مثبتة")
+        if self._serial is None or not self._serial.is_open:
+            # serial_for_url يقبل أسماء المنافذ العادية وعناوين مثل socket://host:port
+            self._serial = serial.serial_for_url(self.port, self._baudrate, timeout=self._timeout)
+    
+    def close(self):
+        if self._serial is not None:
+            self._serial.close()
+    
+    @property
+    def is_open(self) -> bool:
+        return self._serial is not None and self._serial.is_open
+    
+    @property
+    def timeout(self) -> float:
+        return self._timeout
+    
+    @timeout.setter
+    def timeout(self, value: float):
+        self._timeout = value
+        if self._serial is not None:
+            self._serial.timeout = value
+    
+    @property
+    def baudrate(self) -> int:
+        return self._baudrate
+    
+    @baudrate.setter
+    def baudrate(self, value: int):
+        self._baudrate = value
+        if self._serial is not None:
+            self._serial.baudrate = value
+    
+    def write(self, data: bytes) -> int:
+        return self._serial.write(data)
+    
+    def read(self, size: int) -> bytes:
+        return self._serial.read(size)
+    
+    def reset_input_buffer(self):
+        self._serial.reset_input_buffer()
+
+class RecordingTransport(Transport):
+    """يغلف ناقلاً آخر ويسجل كل كتابة وقراءة مع توقيتها في ملف NDJSON"""
+    
+    def __init__(self, inner: Transport, path: str):
+        """
+        Args:
+            inner: الناقل الفعلي (عادةً SerialTransport)
+            path: ملف الجلسة المسجلة
+        """
+        self.inner = inner
+        self.path = path
+        self._file = None
+        self._start = 0.0
+    
+    def open(self):
+        self.inner.open()
+        if self._file is None:
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._start = time.monotonic()
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.inner.close()
+    
+    @property
+    def is_open(self) -> bool:
+        return self.inner.is_open
+    
+    @property
+    def timeout(self) -> float:
+        return self.inner.timeout
+    
+    @timeout.setter
+    def timeout(self, value: float):
+        self.inner.timeout = value
+    
+    @property
+    def baudrate(self) -> int:
+        return self.inner.baudrate
+    
+    @baudrate.setter
+    def baudrate(self, value: int):
+        self.inner.baudrate = value
+    
+    def _record(self, op: str, data: bytes):
+        """تسجيل حدث واحد مع الوقت منذ بداية الجلسة"""
+        event = {"t": round(time.monotonic() - self._start, 6), "op": op, "data": data.hex()}
+        self._file.write(json.dumps(event) + "\n")
+    
+    def write(self, data: bytes) -> int:
+        self._record("w", data)
+        return self.inner.write(data)
+    
+    def read(self, size: int) -> bytes:
+        data = self.inner.read(size)
+        if data:
+            self._record("r", data)
+        return data
+    
+    def reset_input_buffer(self):
+        self.inner.reset_input_buffer()
+
+def load_session(path: str) -> List[Tuple[float, str, bytes]]:
+    """قراءة جلسة مسجلة: قائمة (الوقت، العملية، البيانات)"""
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                event = json.loads(line)
+                events.append((event["t"], event["op"], bytes.fromhex(event["data"])))
+    return events
+
+class ReplayTransport(Transport):
+    """
+    يعيد تشغيل جلسة مسجلة: كل كتابة تُطلق الردود المسجلة بعدها
+    
+    بالسرعة الحقيقية (realtime=True) تتأخر الردود بنفس فواصلها الأصلية،
+    وبأقصى سرعة تُعاد فوراً.
+    """
+    
+    def __init__(self, session, realtime: bool = False, loop: bool = False):
+        """
+        Args:
+            session: مسار ملف الجلسة أو قائمة أحداث من load_session
+            realtime: احترام التوقيت الأصلي للردود
+            loop: إعادة الجلسة من البداية عند انتهائها
+        """
+        self.events = load_session(session) if isinstance(session, str) else list(session)
+        self.realtime = realtime
+        self.loop = loop
+        self.timeout = 1.0
+        self.baudrate = 9600
+        self.mismatches = 0  # كتابات تختلف عن المسجلة
+        self._writes = [i for i, event in enumerate(self.events) if event[1] == "w"]
+        self._open = False
+        self._cursor = 0
+        self._pending: Deque[Tuple[float, bytes]] = deque()  # (لحظة الإتاحة، البيانات)
+    
+    def open(self):
+        self._open = True
+    
+    def close(self):
+        self._open = False
+    
+    @property
+    def is_open(self) -> bool:
+        return self._open
+    
+    def rewind(self):
+        """العودة إلى بداية الجلسة"""
+        self._cursor = 0
+        self._pending.clear()
+    
+    def write(self, data: bytes) -> int:
+        now = time.monotonic()
+        self._cursor = self._find_write(data)
+        if self._cursor is None:
+            # انتهت الجلسة: لا ردود بعد الآن
+            self._cursor = len(self.events)
+            return len(data)
+        
+        written_at, _, expected = self.events[self._cursor]
+        if expected != data:
+            self.mismatches += 1
+        self._cursor += 1
+        
+        # جدولة كل القراءات المسجلة حتى الكتابة التالية
+        while self._cursor < len(self.events) and self.events[self._cursor][1] == "r":
+            read_at, _, chunk = self.events[self._cursor]
+            available = now + (read_at - written_at) if self.realtime else now
+            self._pending.append((available, chunk))
+            self._cursor += 1
+        return len(data)
+    
+    def _find_write(self, data: bytes) -> Optional[int]:
+        """
+        موضع الكتابة المسجلة التالية المطابقة لـ data
+        
+        إذا لم توجد كتابة مطابقة تُستخدم الكتابة التالية أياً كانت،
+        ومع loop=True يستمر البحث من بداية الجلسة.
+        """
+        start = bisect.bisect_left(self._writes, self._cursor)
+        positions = range(start, len(self._writes))
+        if self.loop:
+            positions = itertools.chain(positions, range(0, start))
+        
+        first = None
+        for position in positions:
+            index = self._writes[position]
+            if self.events[index][2] == data:
+                return index
+            if first is None:
+                first = index
+        return first
+    
+    def read(self, size: int) -> bytes:
+        deadline = time.monotonic() + (self.timeout or 0)
+        result = bytearray()
+        while len(result) < size and self._pending:
+            available, chunk = self._pending[0]
+            wait = available - time.monotonic()
+            if wait > 0:
+                if available > deadline:
+                    break
+                time.sleep(wait)
+            
+            needed = size - len(result)
+            result += chunk[:needed]
+            if needed < len(chunk):
+                self._pending[0] = (available, chunk[needed:])
+            else:
+                self._pending.popleft()
+        return bytes(result)
+    
+    def reset_input_buffer(self):
+        self._pending.clear()
@@ -5,11 +5,19 @@ Utility functions for HUSKYLENS operations
 
 import cv2
 import numpy as np
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+from collections import OrderedDict, deque
 import json
 import os
+import struct
+import time
 from datetime import datetime
 
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # اختياري - مطلوب فقط لطريقة المطابقة "hungarian"
+    linear_sum_assignment = None
+
 class HuskyLensUtils:
     """أدوات مساعدة للعمل مع HUSKYLENS"""
     
@@ -57,6 +65,59 @@ class HuskyLensUtils:
         return (region_x <= obj_x <= region_x + region_width and 
                 region_y <= obj_y <= region_y + region_height)
     
+    @staticmethod
+    def check_exposure(image: np.ndarray, boxes, dark: float = 50, bright: float = 200,
+                       min_contrast: float = 15) -> List[str]:
+        """
+        فحص الإضاءة والتباين لكل صندوق
+        
+        Returns:
+            قائمة موازية للصناديق: "dark" أو "bright" أو "flat" (تباين منخفض) أو "ok"
+        """
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        stats = RegionStats(gray)
+        brightness = stats.mean(boxes)[:, 0]
+        contrast = stats.std(boxes)[:, 0]
+        
+        status = np.where(contrast < min_contrast, "flat", "ok")
+        status = np.where(brightness > bright, "bright", status)
+        status = np.where(brightness < dark, "dark", status)
+        return status.tolist()
+    
+    @staticmethod
+    def occupancy_heatmap(boxes, frame_size: Tuple[int, int] = (320, 240),
+                          heatmap: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        عدد الصناديق التي تغطي كل بكسل
+        
+        يضيف كل صندوق أربع قيم في مصفوفة فروق ثم يُجمع تراكمياً مرة واحدة،
+        فالتكلفة O(N + W·H) بدلاً من مجموع مساحات الصناديق.
+        
+        Args:
+            boxes: مصفوفة (N, 4) من (x, y, width, height) أو DetectionFrame
+            frame_size: (العرض، الارتفاع)
+            heatmap: خريطة سابقة (height, width) يضاف إليها (للتجميع عبر الإطارات)
+        """
+        width, height = frame_size
+        if hasattr(boxes, "boxes"):
+            boxes = boxes.boxes
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        x1 = np.clip(boxes[:, 0], 0, width)
+        y1 = np.clip(boxes[:, 1], 0, height)
+        x2 = np.clip(boxes[:, 0] + boxes[:, 2], 0, width)
+        y2 = np.clip(boxes[:, 1] + boxes[:, 3], 0, height)
+        
+        stride = width + 1
+        corners = np.concatenate((y1 * stride + x1, y2 * stride + x2, y1 * stride + x2, y2 * stride + x1))
+        signs = np.repeat(np.array([1, 1, -1, -1], dtype=np.int32), len(boxes))
+        diff = np.bincount(corners, signs, minlength=(height + 1) * stride).astype(np.int32)
+        counts = diff.reshape(height + 1, stride).cumsum(axis=0, dtype=np.int32).cumsum(axis=1, dtype=np.int32)[:height, :width]
+        
+        if heatmap is not None:
+            heatmap += counts
+            return heatmap
+        return counts
+    
     @staticmethod
     def save_detection_log(detections: List[dict], filename: str = None):
         """حفظ سجل الكشوفات في ملف JSON"""
@@ -88,70 +149,450 @@ class HuskyLensUtils:
             print(f"❌ خطأ في قراءة الملف: {filename}")
             return {}
 
+class RegionStats:
+    """
+    جدول مساحات تراكمية (summed-area table) لإطار واحد
+    
+    يُبنى مرة لكل إطار ثم يعطي المتوسط والتباين لأي صندوق في O(1)، فتعتمد
+    التكلفة على عدد الصناديق لا على مساحتها.
+    """
+    
+    def __init__(self, image: np.ndarray):
+        """
+        Args:
+            image: صورة BGR أو رمادية (أو قناع ثنائي)
+        """
+        if image.ndim == 2:
+            image = image[:, :, None]
+        self.image = image
+        self.height, self.width, self.channels = image.shape
+        # CV_32S أسرع، و CV_64F يتجنب تجاوز int32 في الصور الكبيرة
+        small = image.dtype == np.uint8 and self.height * self.width * 255 < 2 ** 31
+        depth = cv2.CV_32S if small else cv2.CV_64F
+        self.sums = cv2.integral(image, sdepth=depth).reshape(self.height + 1, self.width + 1, -1)
+        self._squares: Optional[np.ndarray] = None
+    
+    @property
+    def squares(self) -> np.ndarray:
+        """جدول مجاميع المربعات (يُحسب عند أول طلب للتباين فقط)"""
+        if self._squares is None:
+            _, squares = cv2.integral2(self.image, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+            self._squares = squares.reshape(self.height + 1, self.width + 1, -1)
+        return self._squares
+    
+    def _corners(self, boxes):
+        """زوايا الصناديق بعد قصها على حدود الصورة مع مساحاتها"""
+        if hasattr(boxes, "boxes"):
+            boxes = boxes.boxes
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        x1 = np.clip(boxes[:, 0], 0, self.width)
+        y1 = np.clip(boxes[:, 1], 0, self.height)
+        x2 = np.clip(boxes[:, 0] + boxes[:, 2], 0, self.width)
+        y2 = np.clip(boxes[:, 1] + boxes[:, 3], 0, self.height)
+        return x1, y1, x2, y2, (x2 - x1) * (y2 - y1)
+    
+    @staticmethod
+    def _lookup(table: np.ndarray, x1, y1, x2, y2) -> np.ndarray:
+        return table[y2, x2] - table[y1, x2] - table[y2, x1] + table[y1, x1]
+    
+    @staticmethod
+    def _divide(totals: np.ndarray, area: np.ndarray) -> np.ndarray:
+        result = np.zeros(totals.shape)
+        np.divide(totals, area[:, None], out=result, where=area[:, None] > 0)
+        return result
+    
+    def areas(self, boxes) -> np.ndarray:
+        """عدد البكسلات داخل الصورة لكل صندوق"""
+        return self._corners(boxes)[4]
+    
+    def sum(self, boxes) -> np.ndarray:
+        """مجموع كل قناة لكل صندوق: (N, C)"""
+        x1, y1, x2, y2, _ = self._corners(boxes)
+        return self._lookup(self.sums, x1, y1, x2, y2)
+    
+    def mean(self, boxes) -> np.ndarray:
+        """متوسط كل قناة لكل صندوق: (N, C)؛ الصناديق الفارغة تعطي 0"""
+        x1, y1, x2, y2, area = self._corners(boxes)
+        return self._divide(self._lookup(self.sums, x1, y1, x2, y2), area)
+    
+    def variance(self, boxes) -> np.ndarray:
+        """تباين كل قناة لكل صندوق: (N, C)"""
+        x1, y1, x2, y2, area = self._corners(boxes)
+        mean = self._divide(self._lookup(self.sums, x1, y1, x2, y2), area)
+        mean_square = self._divide(self._lookup(self.squares, x1, y1, x2, y2), area)
+        return np.maximum(mean_square - mean ** 2, 0.0)
+    
+    def std(self, boxes) -> np.ndarray:
+        """الانحراف المعياري لكل قناة لكل صندوق: (N, C)"""
+        return np.sqrt(self.variance(boxes))
+    
+    def grid_mean(self, cells_x: int, cells_y: int) -> np.ndarray:
+        """متوسط كل خلية في شبكة cells_y × cells_x تغطي الصورة: (cells_y, cells_x, C)"""
+        xs = np.arange(cells_x + 1) * self.width // cells_x
+        ys = np.arange(cells_y + 1) * self.height // cells_y
+        x1, y1 = np.meshgrid(xs[:-1], ys[:-1])
+        x2, y2 = np.meshgrid(xs[1:], ys[1:])
+        boxes = np.stack((x1, y1, x2 - x1, y2 - y1), axis=-1).reshape(-1, 4)
+        return self.mean(boxes).reshape(cells_y, cells_x, self.channels)
+
+class OverlayRenderer:
+    """
+    رسم نتيجة إطار كاملة (كتل وأسهم) في تمريرة واحدة
+    
+    جميع المستطيلات ترسم باستدعاء polylines واحد وكذلك الأسهم، والنصوص ترسم بـ putText
+    كما في draw_detection_box، والخرج يُكتب في مخزن مُعد مسبقاً؛ الغرض توحيد الرسم
+    ومعاينة مصغرة اختيارية وليس تسريع رسم النصوص.
+    """
+    
+    def __init__(self, box_color: Tuple[int, int, int] = (0, 255, 0),
+                 center_color: Tuple[int, int, int] = (255, 0, 0),
+                 arrow_color: Tuple[int, int, int] = (0, 0, 255),
+                 label_format: Optional[str] = "ID{id}", scale: float = 1.0,
+                 font_scale: float = 0.6, thickness: int = 2):
+        """
+        Args:
+            box_color, center_color, arrow_color: ألوان BGR كما في أدوات draw_*
+            label_format: نص التسمية لكل كتلة (يقبل {id})، أو None لعدم الكتابة
+            scale: معامل تصغير المعاينة (1.0 = الحجم الكامل)
+            font_scale, thickness: حجم الخط وسماكة الخطوط قبل التصغير
+        """
+        self.box_color = box_color
+        self.center_color = center_color
+        self.arrow_color = arrow_color
+        self.label_format = label_format
+        self.scale = scale
+        self.font_scale = font_scale * scale
+        self.thickness = max(1, int(round(thickness * scale)))
+        self.radius = max(1, int(round(5 * scale)))
+        self._buffer: Optional[np.ndarray] = None
+    
+    def _prepare(self, image: np.ndarray) -> np.ndarray:
+        """نسخ الصورة (أو تصغيرها) إلى المخزن المعاد استخدامه"""
+        height, width = image.shape[:2]
+        size = (max(1, int(width * self.scale)), max(1, int(height * self.scale)))
+        shape = (size[1], size[0], 3)
+        if self._buffer is None or self._buffer.shape != shape:
+            self._buffer = np.empty(shape, dtype=np.uint8)
+        
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        if self.scale == 1.0:
+            np.copyto(self._buffer, image)
+        else:
+            cv2.resize(image, size, dst=self._buffer, interpolation=cv2.INTER_AREA)
+        return self._buffer
+    
+    @staticmethod
+    def _arrow_lines(arrows: np.ndarray) -> List[np.ndarray]:
+        """خط السهم مع رأسه كمقاطع جاهزة لـ polylines (نفس هندسة arrowedLine بطول رأس 0.3)"""
+        tail = arrows[:, :2]
+        head = arrows[:, 2:4]
+        vector = tail - head
+        angle = np.arctan2(vector[:, 1], vector[:, 0])
+        length = 0.3 * np.hypot(vector[:, 0], vector[:, 1])
+        
+        lines = [np.stack((tail, head), axis=1)]
+        for side in (np.pi / 4, -np.pi / 4):
+            wing = head + np.stack((np.cos(angle + side), np.sin(angle + side)), axis=1) * length[:, None]
+            lines.append(np.stack((head, wing), axis=1))
+        return list(np.rint(np.concatenate(lines)).astype(np.int32))
+    
+    def render(self, image: np.ndarray, blocks=(), arrows=(), labels: Optional[List[str]] = None) -> np.ndarray:
+        """
+        رسم جميع الكتل والأسهم على نسخة من الصورة
+        
+        Args:
+            image: صورة الإطار (لا تُعدّل)
+            blocks: قائمة HuskyLensObject أو DetectionFrame
+            arrows: قائمة (x_tail, y_tail, x_head, y_head)
+            labels: نصوص مخصصة موازية للكتل (بدلاً من label_format)
+        
+        Returns:
+            المخزن الداخلي المرسوم؛ يُعاد استخدامه في الاستدعاء التالي فانسخه للاحتفاظ به
+        """
+        canvas = self._prepare(image)
+        
+        if hasattr(blocks, "boxes"):
+            boxes = blocks.boxes
+            ids = blocks.ids.tolist()
+        else:
+            boxes = np.array([(obj.x, obj.y, obj.width, obj.height) for obj in blocks]).reshape(-1, 4)
+            ids = [obj.id for obj in blocks]
+        
+        if len(boxes):
+            x, y, w, h = np.rint(boxes * self.scale).astype(np.int32).T
+            corners = np.stack((x, y, x + w, y, x + w, y + h, x, y + h), axis=1).reshape(-1, 4, 2)
+            cv2.polylines(canvas, list(corners), True, self.box_color, self.thickness)
+            
+            for center in zip((x + w // 2).tolist(), (y + h // 2).tolist()):
+                cv2.circle(canvas, center, self.radius, self.center_color, -1)
+            
+            if labels is None and self.label_format is not None:
+                labels = [self.label_format.format(id=obj_id) for obj_id in ids]
+            if labels:
+                # نفس موضع draw_detection_box: خط الأساس على بعد 10 بكسل فوق الصندوق
+                offset = int(round(10 * self.scale))
+                for text, left, top in zip(labels, x.tolist(), y.tolist()):
+                    if text:
+                        cv2.putText(canvas, text, (left, top - offset), cv2.FONT_HERSHEY_SIMPLEX,
+                                    self.font_scale, self.box_color, self.thickness)
+        
+        arrows = np.asarray(arrows, dtype=np.float64).reshape(-1, 4)
+        if len(arrows):
+            cv2.polylines(canvas, self._arrow_lines(arrows * self.scale), False,
+                          self.arrow_color, self.thickness)
+        
+        return canvas
+
 class ObjectTracker:
     """متتبع الكائنات لتتبع حركة الكائنات عبر الإطارات"""
     
-    def __init__(self, max_history: int = 10):
+    def __init__(self, max_history: int = 10, max_distance: float = 50,
+                 max_missed: int = 3, method: str = "greedy", kalman: bool = False,
+                 process_noise: float = 500.0, measurement_noise: float = 4.0,
+                 latency: float = 0.0):
+        """
+        Args:
+            max_history: عدد المواقع المحفوظة في مسار كل كائن
+            max_distance: أقصى مسافة (بكسل) لربط كشف بكائن متتبع
+            max_missed: عدد الإطارات المتتالية التي يُحتفظ فيها بكائن غائب قبل حذفه
+            method: طريقة المطابقة "greedy" أو "hungarian" (تتطلب scipy)
+            kalman: تفعيل مرشح كالمان بسرعة ثابتة لكل كائن
+            process_noise: تباين التسارع (بكسل²/ث⁴) في نموذج الحركة
+            measurement_noise: تباين خطأ القياس (بكسل²)
+            latency: زمن خط المعالجة (ثوانٍ) بين التقاط الإطار ووصوله
+        """
+        if method == "hungarian" and linear_sum_assignment is None:
+            raise ValueError("طريقة hungarian تتطلب تثبيت scipy")
         self.max_history = max_history
-        self.tracked_objects = {}
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.method = method
+        self.tracked_objects = {}  # المعرف -> مسار المراكز (مخزن دائري)
         self.next_id = 1
+        
+        # حالة الكائنات المتتبعة كمصفوفات لحساب المسافات دفعة واحدة
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._positions = np.zeros((0, 2), dtype=np.float64)
+        self._missed = np.zeros(0, dtype=np.int64)
+        
+        # حالة مرشح كالمان لكل الكائنات: [x, y, vx, vy] والتغاير (T, 4, 4)
+        self.kalman = kalman
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.latency = latency
+        self._state = np.zeros((0, 4), dtype=np.float64)
+        self._covariance = np.zeros((0, 4, 4), dtype=np.float64)
+        self._last_capture = None
     
-    def update(self, detections: List[Tuple[int, int, int, int]]) -> dict:
-        """تحديث الكائنات المتتبعة"""
+    def update(self, detections, timestamp: float = None) -> dict:
+        """
+        تحديث الكائنات المتتبعة
+        
+        Args:
+            detections: قائمة (x, y, w, h) أو مصفوفة (N, 4) أو DetectionFrame
+            timestamp: لحظة وصول الإطار (time.monotonic)، تُستخدم مع مرشح كالمان
+        
+        Returns:
+            قاموس المعرف -> (x, y, w, h) للكائنات المكتشفة في هذا الإطار
+        """
+        boxes = detections.boxes if hasattr(detections, 'boxes') else detections
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        centers = boxes[:, :2] + boxes[:, 2:] // 2
+        
+        if self.kalman:
+            if timestamp is None:
+                timestamp = getattr(detections, 'timestamp', 0.0) or time.monotonic()
+            # لحظة الالتقاط الفعلية = لحظة الوصول - زمن خط المعالجة
+            capture = timestamp - self.latency
+            dt = 0.0 if self._last_capture is None else max(0.0, capture - self._last_capture)
+            self._last_capture = capture
+            self._kalman_predict(dt)
+        
+        if not len(boxes):
+            # إطار فارغ: لا مطابقة، فقط زيادة عداد الغياب
+            self._missed += 1
+            current_frame = {}
+            self._cleanup_old_objects(current_frame)
+            return current_frame
+        
+        det_index, track_index = self._match(centers.astype(np.float64))
+        
+        # تحديث الكائنات المطابقة
+        matched = np.zeros(len(self._ids), dtype=bool)
+        matched[track_index] = True
+        self._positions[track_index] = centers[det_index]
+        self._missed[track_index] = 0
+        if self.kalman and len(track_index):
+            self._kalman_correct(track_index, centers[det_index].astype(np.float64))
+        self._missed[~matched] += 1
+        
+        # التحويل إلى قوائم Python مرة واحدة بدلاً من كل كائن على حدة
+        center_list = list(map(tuple, centers.tolist()))
+        box_list = list(map(tuple, boxes.tolist()))
+        
         current_frame = {}
+        for det, obj_id in zip(det_index.tolist(), self._ids[track_index].tolist()):
+            self.tracked_objects[obj_id].append(center_list[det])
+            current_frame[obj_id] = box_list[det]
         
-        for detection in detections:
-            x, y, w, h = detection
-            center_x = x + w // 2
-            center_y = y + h // 2
-            
-            # البحث عن أقرب كائن متتبع
-            best_match_id = None
-            min_distance = float('inf')
-            
-            for obj_id, history in self.tracked_objects.items():
-                if history:
-                    last_pos = history[-1]
-                    distance = np.sqrt((center_x - last_pos[0])**2 + (center_y - last_pos[1])**2)
-                    
-                    if distance < min_distance and distance < 50:  # عتبة المسافة
-                        min_distance = distance
-                        best_match_id = obj_id
-            
-            # إضافة الكائن
-            if best_match_id is not None:
-                # كائن موجود
-                self.tracked_objects[best_match_id].append((center_x, center_y))
-                if len(self.tracked_objects[best_match_id]) > self.max_history:
-                    self.tracked_objects[best_match_id].pop(0)
-                current_frame[best_match_id] = (x, y, w, h)
-            else:
-                # كائن جديد
-                self.tracked_objects[self.next_id] = [(center_x, center_y)]
-                current_frame[self.next_id] = (x, y, w, h)
-                self.next_id += 1
+        # كائنات جديدة للكشوفات غير المطابقة
+        unmatched = np.ones(len(boxes), dtype=bool)
+        unmatched[det_index] = False
+        new_dets = np.flatnonzero(unmatched)
+        if len(new_dets):
+            new_ids = np.arange(self.next_id, self.next_id + len(new_dets))
+            self.next_id += len(new_dets)
+            self._ids = np.concatenate((self._ids, new_ids))
+            self._positions = np.concatenate((self._positions, centers[new_dets]))
+            self._missed = np.concatenate((self._missed, np.zeros(len(new_dets), dtype=np.int64)))
+            if self.kalman:
+                self._kalman_add(centers[new_dets].astype(np.float64))
+            for obj_id, det in zip(new_ids.tolist(), new_dets.tolist()):
+                self.tracked_objects[obj_id] = deque([center_list[det]], maxlen=self.max_history)
+                current_frame[obj_id] = box_list[det]
         
         # إزالة الكائنات القديمة
         self._cleanup_old_objects(current_frame)
         
         return current_frame
     
+    def _match(self, centers: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """مطابقة الكشوفات مع الكائنات المتتبعة عبر مصفوفة تكلفة كاملة"""
+        empty = np.zeros(0, dtype=np.int64)
+        if not len(centers) or not len(self._ids):
+            return empty, empty
+        
+        positions = self._state[:, :2] if self.kalman else self._positions
+        if len(centers) == 1 or len(positions) == 1:
+            # كشف واحد أو كائن واحد: المطابقة (جشعة أو هنغارية) هي أقرب طرف، دون بناء المصفوفة
+            diff = centers - positions
+            distances = np.einsum('ij,ij->i', diff, diff)
+            best = int(np.argmin(distances))
+            if distances[best] >= self.max_distance ** 2:
+                return empty, empty
+            if len(centers) == 1:
+                return np.zeros(1, dtype=np.int64), np.array([best])
+            return np.array([best]), np.zeros(1, dtype=np.int64)
+        
+        # مصفوفة المسافات (كشوفات × كائنات) في عملية واحدة،
+        # مع مرشح كالمان نقارن بالموقع المتوقع بدلاً من آخر موقع مقاس
+        diff = centers[:, None, :] - positions[None, :, :]
+        cost = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+        cost[cost >= self.max_distance] = np.inf
+        
+        if self.method == "hungarian":
+            finite = np.where(np.isfinite(cost), cost, 1e9)
+            rows, cols = linear_sum_assignment(finite)
+            keep = np.isfinite(cost[rows, cols])
+            return rows[keep], cols[keep]
+        
+        # مطابقة جشعة: في كل جولة نقبل الأزواج التي يكون كل طرف فيها الأقرب للآخر
+        det_parts, track_parts = [], []
+        det_range = np.arange(cost.shape[0])
+        while True:
+            best_track = np.argmin(cost, axis=1)
+            best_cost = cost[det_range, best_track]
+            best_det = np.argmin(cost, axis=0)
+            mutual = np.isfinite(best_cost) & (best_det[best_track] == det_range)
+            if not mutual.any():
+                break
+            dets = det_range[mutual]
+            tracks = best_track[mutual]
+            det_parts.append(dets)
+            track_parts.append(tracks)
+            cost[dets, :] = np.inf
+            cost[:, tracks] = np.inf
+        
+        if not det_parts:
+            return empty, empty
+        return np.concatenate(det_parts), np.concatenate(track_parts)
+    
     def _cleanup_old_objects(self, current_frame: dict):
-        """إزالة الكائنات التي لم تعد مكتشفة"""
-        to_remove = []
-        for obj_id in self.tracked_objects:
-            if obj_id not in current_frame:
-                to_remove.append(obj_id)
+        """إزالة الكائنات الغائبة لأكثر من max_missed إطار"""
+        expired = self._missed > self.max_missed
+        if not expired.any():
+            return
         
-        for obj_id in to_remove:
+        for obj_id in self._ids[expired].tolist():
             del self.tracked_objects[obj_id]
+        
+        alive = ~expired
+        self._ids = self._ids[alive]
+        self._positions = self._positions[alive]
+        self._missed = self._missed[alive]
+        if self.kalman:
+            self._state = self._state[alive]
+            self._covariance = self._covariance[alive]
+    
+    def _kalman_predict(self, dt: float):
+        """خطوة التنبؤ لكل الكائنات دفعة واحدة (نموذج سرعة ثابتة)"""
+        if not len(self._state) or dt <= 0:
+            return
+        transition = np.eye(4)
+        transition[0, 2] = transition[1, 3] = dt
+        
+        # ضجيج العملية لنموذج تسارع عشوائي أبيض
+        q = self.process_noise
+        noise = np.zeros((4, 4))
+        noise[[0, 1], [0, 1]] = q * dt ** 4 / 4
+        noise[[0, 1], [2, 3]] = noise[[2, 3], [0, 1]] = q * dt ** 3 / 2
+        noise[[2, 3], [2, 3]] = q * dt ** 2
+        
+        self._state = self._state @ transition.T
+        self._covariance = transition @ self._covariance @ transition.T + noise
+    
+    def _kalman_correct(self, tracks: np.ndarray, measurements: np.ndarray):
+        """خطوة التصحيح للكائنات المطابقة فقط (القياس = المركز)"""
+        covariance = self._covariance[tracks]
+        innovation = measurements - self._state[tracks, :2]
+        
+        # S = H P Hᵀ + R ، K = P Hᵀ S⁻¹ حيث H تختار الموقع فقط
+        innovation_cov = covariance[:, :2, :2] + np.eye(2) * self.measurement_noise
+        gain = covariance[:, :, :2] @ np.linalg.inv(innovation_cov)
+        
+        self._state[tracks] += np.einsum('tij,tj->ti', gain, innovation)
+        self._covariance[tracks] = covariance - gain @ covariance[:, :2, :]
+    
+    def _kalman_add(self, centers: np.ndarray):
+        """تهيئة المرشح لكائنات جديدة بسرعة صفرية وعدم يقين كبير في السرعة"""
+        state = np.zeros((len(centers), 4))
+        state[:, :2] = centers
+        covariance = np.zeros((len(centers), 4, 4))
+        covariance[:, [0, 1], [0, 1]] = self.measurement_noise
+        covariance[:, [2, 3], [2, 3]] = 1e4
+        self._state = np.concatenate((self._state, state))
+        self._covariance = np.concatenate((self._covariance, covariance))
+    
+    def predict_positions(self, at: float = None) -> dict:
+        """
+        المواقع المتوقعة لكل الكائنات في لحظة معينة (الآن افتراضياً)
+        
+        بدون مرشح كالمان تُرجع آخر موقع مقاس.
+        """
+        if not self.kalman or self._last_capture is None:
+            return dict(zip(self._ids.tolist(), map(tuple, self._positions.tolist())))
+        
+        horizon = (time.monotonic() if at is None else at) - self._last_capture
+        predicted = self._state[:, :2] + self._state[:, 2:] * max(0.0, horizon)
+        return dict(zip(self._ids.tolist(), map(tuple, predicted.tolist())))
+    
+    def predict_position(self, obj_id: int, at: float = None) -> Tuple[float, float]:
+        """الموقع المتوقع لكائن واحد (None إذا لم يكن متتبعاً)"""
+        return self.predict_positions(at).get(obj_id)
     
     def get_trajectory(self, obj_id: int) -> List[Tuple[int, int]]:
         """الحصول على مسار الكائن"""
-        return self.tracked_objects.get(obj_id, [])
+        return list(self.tracked_objects.get(obj_id, ()))
     
     def get_velocity(self, obj_id: int) -> Tuple[float, float]:
-        """حساب سرعة الكائن"""
+        """حساب سرعة الكائن (بكسل/إطار، أو بكسل/ثانية من مرشح كالمان عند تفعيله)"""
+        if self.kalman:
+            index = np.flatnonzero(self._ids == obj_id)
+            if not len(index):
+                return (0.0, 0.0)
+            return tuple(self._state[index[0], 2:].tolist())
+        
         trajectory = self.get_trajectory(obj_id)
         if len(trajectory) < 2:
             return (0.0, 0.0)
@@ -167,13 +608,139 @@ class ObjectTracker:
         
         return (dx / dt, dy / dt)
 
+class ZoneIndex:
+    """فهرس شبكي للمناطق المسماة يجيب عن "أي الكائنات في أي المناطق" للإطار كاملاً"""
+    
+    def __init__(self, frame_width: int = 320, frame_height: int = 240, cell_size: int = 8):
+        """
+        Args:
+            frame_width: عرض إطار العدسة
+            frame_height: ارتفاع إطار العدسة
+            cell_size: حجم خلية الشبكة بالبكسل
+        """
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.cell_size = cell_size
+        self.grid_width = (frame_width + cell_size - 1) // cell_size
+        self.grid_height = (frame_height + cell_size - 1) // cell_size
+        
+        self.names: List[str] = []
+        self._rects = np.zeros((0, 4), dtype=np.int64)  # x1, y1, x2, y2 (شاملة)
+        # لكل خلية: المناطق التي تتقاطع معها (خلايا × مناطق)
+        self._cell_zones = np.zeros((self.grid_width * self.grid_height, 0), dtype=bool)
+        self._inside = set()  # أزواج (المعرف، اسم المنطقة) في الإطار السابق
+    
+    def add_zone(self, name: str, x: int, y: int, width: int, height: int):
+        """إضافة منطقة مستطيلة (أو استبدالها إذا كان الاسم موجوداً)"""
+        if name in self.names:
+            self.remove_zone(name)
+        self.names.append(name)
+        self._rects = np.vstack((self._rects, [[x, y, x + width, y + height]]))
+        self._rebuild()
+    
+    def remove_zone(self, name: str):
+        """حذف منطقة"""
+        index = self.names.index(name)
+        del self.names[index]
+        self._rects = np.delete(self._rects, index, axis=0)
+        self._inside = {pair for pair in self._inside if pair[1] != name}
+        self._rebuild()
+    
+    def _rebuild(self):
+        """إعادة حساب خلايا الشبكة التي تغطيها كل منطقة"""
+        cells = np.zeros((self.grid_height, self.grid_width, len(self.names)), dtype=bool)
+        last_x, last_y = self.grid_width - 1, self.grid_height - 1
+        for zone, (x1, y1, x2, y2) in enumerate(self._rects.tolist()):
+            # القص إلى حدود الشبكة كما تُقص النقاط في query
+            cx1, cx2 = (min(max(0, v // self.cell_size), last_x) for v in (x1, x2))
+            cy1, cy2 = (min(max(0, v // self.cell_size), last_y) for v in (y1, y2))
+            if cx1 <= cx2 and cy1 <= cy2:
+                cells[cy1:cy2 + 1, cx1:cx2 + 1, zone] = True
+        # شكل صريح: reshape(-1, 0) يفشل بعد حذف آخر منطقة
+        self._cell_zones = cells.reshape(self.grid_height * self.grid_width, len(self.names))
+    
+    def query(self, points) -> np.ndarray:
+        """
+        عضوية كل النقاط في كل المناطق في استدعاء واحد
+        
+        Args:
+            points: مصفوفة (N, 2) من المواقع (x, y)
+        
+        Returns:
+            مصفوفة منطقية (N, عدد المناطق)
+        """
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        result = np.zeros((len(points), len(self.names)), dtype=bool)
+        if not len(points) or not self.names:
+            return result
+        
+        # المرشحون من الشبكة، ثم فحص دقيق للأزواج المرشحة فقط
+        cell_x = np.clip(points[:, 0] // self.cell_size, 0, self.grid_width - 1)
+        cell_y = np.clip(points[:, 1] // self.cell_size, 0, self.grid_height - 1)
+        point_index, zone_index = np.nonzero(self._cell_zones[cell_y * self.grid_width + cell_x])
+        
+        px, py = points[point_index, 0], points[point_index, 1]
+        rects = self._rects[zone_index]
+        inside = (rects[:, 0] <= px) & (px <= rects[:, 2]) & (rects[:, 1] <= py) & (py <= rects[:, 3])
+        result[point_index[inside], zone_index[inside]] = True
+        return result
+    
+    def zones_for(self, points) -> List[List[str]]:
+        """أسماء المناطق التي تحتوي كل نقطة"""
+        membership = self.query(points)
+        return [[self.names[zone] for zone in np.flatnonzero(row)] for row in membership]
+    
+    def update(self, objects: dict) -> List[Tuple[str, int, str]]:
+        """
+        تحديث المناطق بإطار جديد وإرجاع أحداث الدخول والخروج
+        
+        Args:
+            objects: قاموس المعرف -> (x, y, w, h) مثل ناتج ObjectTracker.update
+        
+        Returns:
+            قائمة من ("enter" أو "exit"، المعرف، اسم المنطقة)
+        """
+        ids = list(objects)
+        boxes = np.asarray([objects[obj_id] for obj_id in ids], dtype=np.int64).reshape(-1, 4)
+        point_index, zone_index = np.nonzero(self.query(boxes[:, :2] + boxes[:, 2:] // 2))
+        inside = {(ids[p], self.names[z]) for p, z in zip(point_index.tolist(), zone_index.tolist())}
+        
+        events = [("enter", obj_id, name) for obj_id, name in inside - self._inside]
+        events += [("exit", obj_id, name) for obj_id, name in self._inside - inside]
+        self._inside = inside
+        return events
+    
+    def occupancy(self) -> dict:
+        """اسم المنطقة -> مجموعة معرفات الكائنات الموجودة فيها حالياً"""
+        result = {name: set() for name in self.names}
+        for obj_id, name in self._inside:
+            result[name].add(obj_id)
+        return result
+
 class ColorAnalyzer:
     """محلل الألوان للكائنات المكتشفة"""
     
+    COLOR_NAMES = ("أسود", "أبيض", "رمادي", "أحمر", "برتقالي", "أصفر", "أخضر", "أزرق", "بنفسجي", "غير محدد")
+    BLACK, WHITE, GRAY = 0, 1, 2
+    
+    # جدول بحث لتدرج اللون (H من 0 إلى 255) -> فهرس اسم اللون الملون
+    HUE_LUT = np.full(256, 9, dtype=np.uint8)
+    HUE_LUT[:10] = 3      # أحمر
+    HUE_LUT[10:25] = 4    # برتقالي
+    HUE_LUT[25:35] = 5    # أصفر
+    HUE_LUT[35:85] = 6    # أخضر
+    HUE_LUT[85:130] = 7   # أزرق
+    HUE_LUT[130:170] = 8  # بنفسجي (170 نفسه غير محدد)
+    HUE_LUT[171:180] = 3  # أحمر
+    
     @staticmethod
     def get_dominant_color(image: np.ndarray, x: int, y: int, 
-                          width: int, height: int) -> Tuple[int, int, int]:
-        """الحصول على اللون السائد في منطقة الكائن"""
+                          width: int, height: int,
+                          stats: Optional[RegionStats] = None) -> Tuple[int, int, int]:
+        """الحصول على اللون السائد في منطقة الكائن (O(1) إذا أعطي RegionStats للإطار)"""
+        if stats is not None:
+            return tuple(ColorAnalyzer.get_dominant_colors(stats, [(x, y, width, height)])[0].tolist())
+        
         # استخراج المنطقة
         roi = image[y:y+height, x:x+width]
         
@@ -190,35 +757,187 @@ class ColorAnalyzer:
         mean_color = cv2.mean(roi_bgr)[:3]
         return tuple(map(int, mean_color))
     
+    @staticmethod
+    def get_dominant_colors(image, boxes) -> np.ndarray:
+        """
+        متوسط لون BGR لكل صندوق دفعة واحدة عبر صورة تكاملية
+        
+        Args:
+            image: صورة BGR أو رمادية، أو RegionStats مبني مسبقاً للإطار
+            boxes: مصفوفة (N, 4) من (x, y, width, height) أو DetectionFrame
+        
+        Returns:
+            مصفوفة (N, 3) int32؛ الصناديق الفارغة أو خارج الصورة تعطي (0, 0, 0)
+        """
+        stats = image if isinstance(image, RegionStats) else RegionStats(image)
+        means = stats.mean(boxes)
+        if means.shape[1] == 1:
+            means = np.repeat(means, 3, axis=1)
+        return means[:, :3].astype(np.int32)
+    
+    @staticmethod
+    def classify_colors(bgr_colors) -> List[str]:
+        """تصنيف مجموعة ألوان BGR بتحويل HSV واحد وعتبات متجهة"""
+        colors = np.asarray(bgr_colors).reshape(-1, 3)
+        if len(colors) == 0:
+            return []
+        
+        hsv = cv2.cvtColor(colors.astype(np.uint8)[None], cv2.COLOR_BGR2HSV)[0]
+        h, s, v = hsv[:, 0], hsv[:, 1], hsv[:, 2]
+        
+        indices = ColorAnalyzer.HUE_LUT[h]
+        indices = np.where(s < 50, np.where(v > 200, ColorAnalyzer.WHITE, ColorAnalyzer.GRAY), indices)
+        indices = np.where(v < 50, ColorAnalyzer.BLACK, indices)
+        
+        names = ColorAnalyzer.COLOR_NAMES
+        return [names[i] for i in indices.tolist()]
+    
+    @staticmethod
+    def classify_boxes(image: np.ndarray, boxes) -> Tuple[np.ndarray, List[str]]:
+        """متوسط اللون واسمه لجميع صناديق الإطار في استدعاء واحد"""
+        colors = ColorAnalyzer.get_dominant_colors(image, boxes)
+        return colors, ColorAnalyzer.classify_colors(colors)
+    
     @staticmethod
     def classify_color(bgr_color: Tuple[int, int, int]) -> str:
         """تصنيف اللون إلى اسم"""
-        b, g, r = bgr_color
-        
-        # تحويل إلى HSV لتصنيف أفضل
-        hsv = cv2.cvtColor(np.uint8([[[b, g, r]]]), cv2.COLOR_BGR2HSV)[0][0]
-        h, s, v = hsv
-        
-        if v < 50:
-            return "أسود"
-        elif v > 200 and s < 50:
-            return "أبيض"
-        elif s < 50:
-            return "رمادي"
-        elif h < 10 or h > 170:
-            return "أحمر"
-        elif 10 <= h < 25:
-            return "برتقالي"
-        elif 25 <= h < 35:
-            return "أصفر"
-        elif 35 <= h < 85:
-            return "أخضر"
-        elif 85 <= h < 130:
-            return "أزرق"
-        elif 130 <= h < 170:
-            return "بنفسجي"
-        else:
-            return "غير محدد"
+        return ColorAnalyzer.classify_colors([bgr_color])[0]
+
+class DominantColorEngine:
+    """استخراج اللون السائد الحقيقي (وليس المتوسط) مع ذاكرة مؤقتة لكل كائن متتبع"""
+    
+    METHODS = ("histogram", "kmeans", "mean")
+    
+    def __init__(self, method: str = "histogram", bins: int = 8, clusters: int = 3,
+                 sample_size: int = 256, iterations: int = 10, cache_size: int = 256, seed: int = 0):
+        """
+        Args:
+            method: "histogram" (قمة مدرج ثلاثي الأبعاد مكمم)، "kmeans" (mini-batch على عينة)، أو "mean"
+            bins: عدد المستويات لكل قناة في طريقة المدرج (قوة للعدد 2)
+            clusters: عدد المجموعات في طريقة k-means
+            sample_size: أقصى عدد بكسلات تؤخذ من كل منطقة في طريقة k-means
+            iterations: عدد دفعات تحديث k-means
+            cache_size: عدد النتائج المحفوظة (الأقدم استخداماً يحذف أولاً)
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"طريقة غير معروفة: {method}")
+        if bins & (bins - 1) or not 1 <= bins <= 256:
+            raise ValueError("bins يجب أن يكون قوة للعدد 2 بين 1 و 256")
+        
+        self.method = method
+        self.bins = bins
+        self.shift = 8 - (bins.bit_length() - 1)
+        self.clusters = clusters
+        self.sample_size = sample_size
+        self.iterations = iterations
+        self.cache_size = cache_size
+        self._rng = np.random.default_rng(seed)
+        self._cache: "OrderedDict[object, Tuple[bytes, Tuple[int, int, int]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def fingerprint(roi: np.ndarray) -> bytes:
+        """بصمة رخيصة للمنطقة: عينة 8x8 مكممة إلى 3 بتات لكل قناة مع الحجم التقريبي"""
+        height, width = roi.shape[:2]
+        step_y = max(1, height // 8)
+        step_x = max(1, width // 8)
+        sample = roi[::step_y, ::step_x][:8, :8] >> 5
+        return struct.pack('<HH', height // 8, width // 8) + sample.tobytes()
+    
+    def _pixels(self, roi: np.ndarray) -> np.ndarray:
+        """بكسلات المنطقة كمصفوفة (N, 3) BGR"""
+        if roi.ndim == 2:
+            roi = np.repeat(roi[:, :, None], 3, axis=2)
+        return roi[:, :, :3].reshape(-1, 3)
+    
+    def _histogram_peak(self, pixels: np.ndarray) -> Tuple[int, int, int]:
+        """متوسط بكسلات الخلية الأكثر تكراراً في مدرج BGR المكمم"""
+        quantized = (pixels >> self.shift).astype(np.int64)
+        cells = (quantized[:, 0] * self.bins + quantized[:, 1]) * self.bins + quantized[:, 2]
+        peak = np.bincount(cells, minlength=self.bins ** 3).argmax()
+        return tuple(map(int, pixels[cells == peak].mean(axis=0)))
+    
+    def _kmeans(self, pixels: np.ndarray) -> Tuple[int, int, int]:
+        """مركز أكبر مجموعة بعد mini-batch k-means على عينة من البكسلات"""
+        if len(pixels) > self.sample_size:
+            pixels = pixels[self._rng.integers(0, len(pixels), self.sample_size)]
+        samples = pixels.astype(np.float64)
+        k = min(self.clusters, len(samples))
+        centers = samples[self._rng.choice(len(samples), k, replace=False)].copy()
+        counts = np.zeros(k)
+        batch_size = max(k, len(samples) // 4)
+        
+        for _ in range(self.iterations):
+            batch = samples[self._rng.choice(len(samples), batch_size)]
+            labels = ((batch[:, None, :] - centers[None]) ** 2).sum(axis=2).argmin(axis=1)
+            # تحديث تدريجي: معدل التعلم لكل مركز 1/عدد نقاطه حتى الآن
+            sizes = np.bincount(labels, minlength=k)
+            sums = np.stack([np.bincount(labels, batch[:, c], minlength=k) for c in range(3)], axis=1)
+            counts += sizes
+            assigned = sizes > 0
+            centers[assigned] += (sums[assigned] - sizes[assigned, None] * centers[assigned]) / counts[assigned, None]
+        
+        labels = ((samples[:, None, :] - centers[None]) ** 2).sum(axis=2).argmin(axis=1)
+        largest = np.bincount(labels, minlength=k).argmax()
+        return tuple(map(int, centers[largest]))
+    
+    def _compute(self, roi: np.ndarray) -> Tuple[int, int, int]:
+        if self.method == "mean":
+            return ColorAnalyzer.get_dominant_color(roi, 0, 0, roi.shape[1], roi.shape[0])
+        pixels = self._pixels(roi)
+        if self.method == "histogram":
+            return self._histogram_peak(pixels)
+        return self._kmeans(pixels)
+    
+    def extract(self, image: np.ndarray, x: int, y: int, width: int, height: int,
+                track_id: Optional[int] = None) -> Tuple[int, int, int]:
+        """
+        اللون السائد في منطقة الكائن
+        
+        إذا أعطي track_id تعاد النتيجة المحفوظة لهذا الكائن ما دامت بصمة منطقته لم تتغير.
+        """
+        roi = image[max(0, y):y + height, max(0, x):x + width]
+        if roi.size == 0:
+            return (0, 0, 0)
+        
+        signature = self.fingerprint(roi)
+        key = track_id if track_id is not None else signature
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == signature:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+        
+        self.misses += 1
+        color = self._compute(roi)
+        self._cache[key] = (signature, color)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return color
+    
+    def extract_many(self, image: np.ndarray, boxes, track_ids=None) -> np.ndarray:
+        """اللون السائد لكل صندوق (N, 4)؛ track_ids قائمة معرفات موازية اختيارية"""
+        if hasattr(boxes, "boxes"):
+            if track_ids is None:
+                track_ids = boxes.ids.tolist()
+            boxes = boxes.boxes
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        if track_ids is None:
+            track_ids = [None] * len(boxes)
+        
+        colors = [self.extract(image, x, y, w, h, track_id)
+                  for (x, y, w, h), track_id in zip(boxes.tolist(), track_ids)]
+        return np.array(colors, dtype=np.int32).reshape(-1, 3)
+    
+    def forget(self, track_id: int):
+        """حذف النتيجة المحفوظة لكائن اختفى"""
+        self._cache.pop(track_id, None)
+    
+    def clear(self):
+        """مسح الذاكرة المؤقتة"""
+        self._cache.clear()
 
 def create_sample_image_with_objects():
     """إنشاء صورة تجريبية مع كائنات ملونة للاختبار"""